@@ -0,0 +1,106 @@
+"""Asyncio interface to the S3 communication tools."""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+import pandas as pd
+
+from osc_extraction_utils.s3_communication import (
+    DeletionSummary,
+    S3Communication,
+    S3FileType,
+    TransferSummary,
+)
+
+_R = TypeVar("_R")
+
+
+class AsyncS3Communication(object):
+    """
+    Class to communicate with a ceph s3 bucket from asyncio code.
+
+    Every call runs the blocking method of the wrapped S3Communication in a dedicated thread pool, hence transfers
+    overlap with other coroutines, for example HTTP calls to the extraction and inference servers. A semaphore
+    bounds the number of concurrent calls to max_concurrency. Since the wrapped communicator is used as is, the async
+    interface can be tested against any local s3 stand-in the communicator is pointed to.
+    """
+
+    def __init__(self, s3_communication: S3Communication, max_concurrency: int = 8) -> None:
+        """Initialize communicator."""
+        self.s3_communication = s3_communication
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async_s3")
+
+    async def __aenter__(self) -> "AsyncS3Communication":
+        """Return the communicator."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Shut down the thread pool and wait for the pending calls without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    def close(self) -> None:
+        """Shut down the thread pool without waiting, the pending calls still complete."""
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, function: Callable[..., _R], *args, **kwargs) -> _R:
+        """Run blocking function in the thread pool, once the semaphore admits another call."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def upload_file_to_s3(
+        self, filepath: Path | str, s3_prefix: str, s3_key: str, metadata: dict[str, str] | None = None
+    ) -> None:
+        """Stream file from disk to s3 bucket/prefix/key."""
+        await self._run(self.s3_communication.upload_file_to_s3, filepath, s3_prefix, s3_key, metadata=metadata)
+
+    async def download_file_from_s3(self, filepath: Path | str, s3_prefix: str, s3_key: str) -> None:
+        """Stream file from s3 bucket/prefix/key to filepath on disk."""
+        await self._run(self.s3_communication.download_file_from_s3, filepath, s3_prefix, s3_key)
+
+    async def upload_df_to_s3(
+        self, df: pd.DataFrame, s3_prefix: str, s3_key: str, filetype=S3FileType.PARQUET, **pd_to_ftype_args
+    ) -> None:
+        """Save the data frame at s3 bucket/prefix/key."""
+        await self._run(
+            self.s3_communication.upload_df_to_s3, df, s3_prefix, s3_key, filetype=filetype, **pd_to_ftype_args
+        )
+
+    async def download_df_from_s3(
+        self, s3_prefix: str, s3_key: str, filetype=S3FileType.PARQUET, **pd_read_ftype_args
+    ) -> pd.DataFrame:
+        """Read the data frame at s3 bucket/prefix/key."""
+        return await self._run(
+            self.s3_communication.download_df_from_s3, s3_prefix, s3_key, filetype=filetype, **pd_read_ftype_args
+        )
+
+    async def list_files_in_prefix(self, s3_prefix: str, **kwargs) -> list[dict[str, Any]]:
+        """List all objects under a prefix, recursively, see S3Communication.iter_objects for the keyword arguments."""
+        return await self._run(lambda: list(self.s3_communication.iter_objects(s3_prefix, **kwargs)))
+
+    async def upload_files_in_dir_to_prefix(self, source_dir, s3_prefix, **kwargs) -> TransferSummary:
+        """Upload all files in a directory to under the s3 prefix, see S3Communication for the keyword arguments."""
+        return await self._run(self.s3_communication.upload_files_in_dir_to_prefix, source_dir, s3_prefix, **kwargs)
+
+    async def download_files_in_prefix_to_dir(self, s3_prefix, destination_dir, **kwargs) -> TransferSummary:
+        """Download all files under a prefix to a directory, see S3Communication for the keyword arguments."""
+        return await self._run(
+            self.s3_communication.download_files_in_prefix_to_dir, s3_prefix, destination_dir, **kwargs
+        )
+
+    async def delete_files_in_prefix(self, s3_prefix: str, **kwargs) -> DeletionSummary:
+        """Delete all objects under the s3 prefix, see S3Communication for the keyword arguments."""
+        return await self._run(self.s3_communication.delete_files_in_prefix, s3_prefix, **kwargs)
+
+    async def copy_files_in_prefix_to_s3(
+        self, s3_prefix, destination: S3Communication, destination_prefix, **kwargs
+    ) -> TransferSummary:
+        """Copy all objects under a prefix to another bucket, see S3Communication for the keyword arguments."""
+        return await self._run(
+            self.s3_communication.copy_files_in_prefix_to_s3, s3_prefix, destination, destination_prefix, **kwargs
+        )
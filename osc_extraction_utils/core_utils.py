@@ -2,7 +2,7 @@ import shutil
 from pathlib import Path
 
 from osc_extraction_utils.s3_communication import S3Communication
-from osc_extraction_utils.settings import MainSettings
+from osc_extraction_utils.settings import MainSettings, S3Settings
 
 
 def create_folder(path_folder: Path) -> None:
@@ -69,7 +69,33 @@ def download_data_from_s3_main_bucket_to_local_folder_if_required(
 
 
 def upload_data_from_local_folder_to_s3_interim_bucket_if_required(
-    s3_bucket: S3Communication, path_local_folder: Path, path_s3_with_prefix_folder: Path, main_settings: MainSettings
+    s3_bucket: S3Communication,
+    path_local_folder: Path,
+    path_s3_with_prefix_folder: Path,
+    main_settings: MainSettings,
+    max_workers: int | None = None,
 ):
     if main_settings.general.s3_usage:
-        s3_bucket.upload_files_in_dir_to_prefix(path_local_folder, path_s3_with_prefix_folder)
+        if max_workers is None:
+            # the same parallelism as the downloads of the pipeline
+            max_workers = (main_settings.s3_settings or S3Settings()).max_workers
+        s3_bucket.upload_files_in_dir_to_prefix(
+            path_local_folder, path_s3_with_prefix_folder, max_workers=max_workers, skip_unchanged=True
+        )
+
+
+def copy_data_from_s3_main_bucket_to_s3_interim_bucket_if_required(
+    s3_bucket_main: S3Communication,
+    path_s3_main_with_prefix_folder: Path,
+    s3_bucket_interim: S3Communication,
+    path_s3_interim_with_prefix_folder: Path,
+    main_settings: MainSettings,
+    max_workers: int = 1,
+):
+    if main_settings.general.s3_usage:
+        s3_bucket_main.copy_files_in_prefix_to_s3(
+            str(path_s3_main_with_prefix_folder),
+            s3_bucket_interim,
+            str(path_s3_interim_with_prefix_folder),
+            max_workers=max_workers,
+        )
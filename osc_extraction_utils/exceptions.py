@@ -1,2 +1,6 @@
 class AnnotationConversionError(Exception):
     pass
+
+
+class S3DeletionError(Exception):
+    pass
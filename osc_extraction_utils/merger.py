@@ -1,11 +1,264 @@
 import glob
+import io
+import json
 import os
+import os.path as osp
+import uuid
+from itertools import chain
 from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+import pandas as pd
 
 from osc_extraction_utils.paths import ProjectPaths
-from osc_extraction_utils.s3_communication import S3Communication
+from osc_extraction_utils.s3_cache import S3ObjectCache
+from osc_extraction_utils.s3_communication import (
+    S3Communication,
+    _md5_of_file,
+    _prefetch,
+)
 from osc_extraction_utils.settings import MainSettings, S3Settings
 
+# size of the blocks copied between the csv files and of the buffer of the merged file
+MERGE_BUFFER_SIZE = 16 * 1024**2
+# number of rows read and written at once when the columns of csv files are aligned
+MERGE_CHUNK_ROWS = 64 * 1024
+TEXT_3434_MANIFEST_FILENAME = ".text_3434_manifest.json"
+
+
+def append_csv_file(
+    path_csv: Path | str, file_out: BinaryIO, skip_header: bool, buffer_size: int = MERGE_BUFFER_SIZE
+) -> None:
+    """
+    Append the content of a csv file to the binary file object file_out, optionally without its header line.
+
+    The content is copied in blocks of buffer_size instead of line by line. A line break is added if the file does
+    not end with one, hence the first row of the next file appended never continues the last row of this one.
+    """
+    with open(path_csv, "rb") as file_in:
+        if skip_header:
+            file_in.readline()
+        last_block = b""
+        while block := file_in.read(buffer_size):
+            file_out.write(block)
+            last_block = block
+        if last_block and not last_block.endswith(b"\n"):
+            file_out.write(b"\n")
+
+
+class _ConcatenatedCsvReader(io.RawIOBase):
+    """
+    Read only file object concatenating csv file objects, keeping only the header line of the first one.
+
+    As in append_csv_file, a line break is added after a file which does not end with one. Every source is closed
+    once it is read.
+    """
+
+    def __init__(self, sources: Iterable[BinaryIO], chunk_size: int = 1024**2) -> None:
+        """Initialize reader."""
+        super().__init__()
+        self._sources = iter(sources)
+        self._chunk_size = chunk_size
+        self._source: BinaryIO | None = None
+        self._is_first_source = True
+        self._skip_header = False
+        self._ends_with_line_break = True
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_chunk(self) -> bytes | None:
+        """Return the next chunk of the concatenation, which may be empty, or None once all sources are read."""
+        if self._source is None:
+            self._source = next(self._sources, None)
+            if self._source is None:
+                return None
+            self._skip_header = not self._is_first_source
+            self._is_first_source = False
+            self._ends_with_line_break = True
+        chunk = self._source.read(self._chunk_size)
+        if not chunk:
+            self._source.close()
+            self._source = None
+            return b"" if self._ends_with_line_break else b"\n"
+        if self._skip_header:
+            index_line_break = chunk.find(b"\n")
+            if index_line_break < 0:
+                return b""
+            chunk = chunk[index_line_break + 1 :]
+            self._skip_header = False
+        if chunk:
+            self._ends_with_line_break = chunk.endswith(b"\n")
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = self._next_chunk()
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        super().close()
+
+
+def merge_csv_files_in_s3(
+    s3_communication_source: S3Communication,
+    s3_prefix: str,
+    s3_communication_destination: S3Communication,
+    destination_prefix: str,
+    destination_key: str,
+    include: Iterable[str] = ("*.csv",),
+) -> int:
+    """
+    Merge the csv objects under s3_prefix into one object, keeping only the header of the first one.
+
+    The objects are streamed from the source bucket into a multipart upload to the destination bucket, without
+    staging them on local disk. The next object is requested while the current one is streamed. Returns the number
+    of objects merged, nothing is uploaded if there are none.
+    """
+    keys = [file["Key"] for file in s3_communication_source.iter_objects(s3_prefix, include=include)]
+    if not keys:
+        return 0
+
+    def bodies() -> Iterator[BinaryIO]:
+        for key in keys:
+            yield s3_communication_source.open_file_in_s3(osp.dirname(key), osp.basename(key))
+
+    def sources() -> Iterator[BinaryIO]:
+        # printed by the merge, not by the thread opening the next object
+        for key, body in zip(keys, _prefetch(bodies())):
+            print(key)
+            yield body
+
+    with io.BufferedReader(_ConcatenatedCsvReader(sources()), MERGE_BUFFER_SIZE) as file_merged:
+        s3_communication_destination.upload_fileobj_to_s3(file_merged, destination_prefix, destination_key)
+    return len(keys)
+
+
+def _file_state(path: Path | str) -> dict:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def merge_csv_files_incremental(
+    paths_csv: Iterable[str], path_out: Path | str, path_manifest: Path | str, rebuild: bool = False
+) -> int:
+    """
+    Merge the csv files into path_out, keeping only the header of the first file, and record them in a manifest.
+
+    The manifest holds the path, size, modification time and md5 digest of every merged file and the state of the
+    merged file. Files not merged yet are appended to path_out. The merged file is rebuilt from scratch if rebuild
+    is set, or if a merged file changed its content or disappeared, or if path_out changed since the last merge.
+    Files whose size and modification time are unchanged are not hashed again.
+    Every file is merged as soon as paths_csv yields it, hence paths_csv can be a generator producing the files
+    while the previous ones are merged. Returns the number of files.
+    """
+    try:
+        with open(path_manifest) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {}
+    inputs_merged: dict[str, dict] = manifest.get("inputs", {})
+    rebuild = (
+        rebuild or not inputs_merged or not os.path.isfile(path_out) or manifest.get("output") != _file_state(path_out)
+    )
+
+    inputs: dict[str, dict] = {}
+    with open(path_out, "wb" if rebuild else "ab", buffering=MERGE_BUFFER_SIZE) as file_out:
+
+        def merge_all_from_scratch() -> None:
+            file_out.truncate(0)
+            for index, path_csv_merged in enumerate(inputs):
+                print(path_csv_merged)
+                append_csv_file(path_csv_merged, file_out, skip_header=index > 0)
+
+        for path_csv in paths_csv:
+            if path_csv in inputs:
+                continue
+            state = _file_state(path_csv)
+            entry = inputs_merged.get(path_csv)
+            if entry is not None and entry["size"] == state["size"] and entry["mtime_ns"] == state["mtime_ns"]:
+                state["md5"] = entry["md5"]
+            else:
+                state["md5"] = _md5_of_file(path_csv)
+            inputs[path_csv] = state
+            if rebuild or entry is None:
+                print(path_csv)
+                append_csv_file(path_csv, file_out, skip_header=len(inputs) > 1 or not rebuild)
+            elif entry["md5"] != state["md5"]:
+                rebuild = True
+                merge_all_from_scratch()
+        if not rebuild and not inputs_merged.keys() <= inputs.keys():
+            merge_all_from_scratch()
+
+    path_manifest_temporary = f"{path_manifest}.{uuid.uuid4().hex}.part"
+    with open(path_manifest_temporary, "w") as f:
+        json.dump({"inputs": inputs, "output": _file_state(path_out)}, f, indent=1, sort_keys=True)
+    os.replace(path_manifest_temporary, path_manifest)
+    return len(inputs)
+
+
+def _read_csv_header(path_csv: Path | str) -> list[str]:
+    try:
+        return list(pd.read_csv(path_csv, nrows=0).columns)
+    except pd.errors.EmptyDataError:
+        return []
+
+
+def merge_csv_files_aligned(paths_csv: Iterable[str], path_out: Path | str, chunk_rows: int = MERGE_CHUNK_ROWS) -> int:
+    """
+    Merge the csv files into path_out with the union of their columns, in the order the columns first appear.
+
+    Unlike merge_csv_files_incremental, which assumes every file has the header of the first one, the columns are
+    matched by name: files with reordered, missing or extra columns are read in chunks of chunk_rows rows, aligned
+    to the merged columns with DataFrame.reindex and appended, missing values are left empty. Values are read and
+    written as strings, hence they are not altered by type inference. Files whose columns equal the merged columns
+    are copied in blocks without being parsed. Only the headers are read before the merged file is written. Files
+    without header are skipped. Returns the number of files.
+    """
+    headers = {path_csv: _read_csv_header(path_csv) for path_csv in paths_csv}
+    columns = list(dict.fromkeys(chain.from_iterable(headers.values())))
+
+    header_written = False
+    with open(path_out, "wb", buffering=MERGE_BUFFER_SIZE) as file_out:
+        for path_csv, header in headers.items():
+            if not header:
+                continue
+            print(path_csv)
+            if header == columns:
+                append_csv_file(path_csv, file_out, skip_header=header_written)
+                header_written = True
+                continue
+            with pd.read_csv(
+                path_csv, dtype=str, keep_default_na=False, na_filter=False, chunksize=chunk_rows
+            ) as reader:
+                for chunk in reader:
+                    chunk.reindex(columns=columns, fill_value="").to_csv(
+                        file_out, mode="wb", header=not header_written, index=False, lineterminator="\n"
+                    )
+                    header_written = True
+            if not header_written:
+                # a file with a header but without rows
+                pd.DataFrame(columns=columns).to_csv(file_out, mode="wb", index=False, lineterminator="\n")
+                header_written = True
+    return len(headers)
+
+
+def _return_s3_object_cache(s3_settings: S3Settings, project_paths: ProjectPaths) -> S3ObjectCache | None:
+    """Return the object cache in the project data folder if it is enabled in the s3 settings, else None."""
+    if not s3_settings.cache_enabled:
+        return None
+    return S3ObjectCache(project_paths.path_folder_s3_cache, max_size_bytes=s3_settings.cache_max_size_bytes)
+
 
 class Merger:
     # TODO finish Merger class
@@ -27,6 +280,7 @@ class Merger:
             aws_access_key_id=os.getenv(self.s3_settings.main_bucket.s3_access_key),
             aws_secret_access_key=os.getenv(self.s3_settings.main_bucket.s3_secret_key),
             s3_bucket=os.getenv(self.s3_settings.main_bucket.s3_bucket_name),
+            cache=_return_s3_object_cache(self.s3_settings, self.project_paths),
         )
 
     def _return_s3_communication_interim(self) -> S3Communication:
@@ -62,29 +316,31 @@ class Merger:
         self.s3_communication_interim.upload_file_to_s3(filepath=str(path_file_upload_to_s3), s3_prefix=str(path_file_upload_to_s3.parent), s3_key=str(path_file_upload_to_s3.name))  # type: ignore
 
     def _weird_writing_stuff(self) -> bool:
-        with open(str(self.project_paths.path_folder_text_3434) + r"/text_3434.csv", "w") as file_out:
-            very_first = True
+        with open(
+            str(self.project_paths.path_folder_text_3434) + r"/text_3434.csv", "wb", buffering=MERGE_BUFFER_SIZE
+        ) as file_out:
             rel_inf_list = list(glob.iglob(str(self.project_paths.path_folder_relevance) + r"/*.csv"))
-        if len(rel_inf_list) == 0:
-            print("No relevance inference results found.")
-            return False
-        else:
-            try:
-                for filepath in rel_inf_list:
-                    print(filepath)
-                    with open(filepath) as file_in:
-                        first = True
-                        for line in file_in:
-                            if very_first or not first:
-                                file_out.write(line)
-                            first = False
-                        very_first = False
-                return True  # TODO added here to comform mypy, is this required?
-            except Exception:
+            if len(rel_inf_list) == 0:
+                print("No relevance inference results found.")
                 return False
+            else:
+                try:
+                    for index, filepath in enumerate(rel_inf_list):
+                        print(filepath)
+                        append_csv_file(filepath, file_out, skip_header=index > 0)
+                    return True  # TODO added here to comform mypy, is this required?
+                except Exception:
+                    return False
 
 
-def generate_text_3434(project_name: str, s3_usage: bool, s3_settings: S3Settings, project_paths: ProjectPaths):
+def generate_text_3434(
+    project_name: str,
+    s3_usage: bool,
+    s3_settings: S3Settings,
+    project_paths: ProjectPaths,
+    incremental: bool = True,
+    align_columns: bool = False,
+):
     """
     This function merges all infer relevance outputs into one large file, which is then
     used to train the kpi extraction model.
@@ -92,6 +348,10 @@ def generate_text_3434(project_name: str, s3_usage: bool, s3_settings: S3Setting
     :param project_name: str, representing the project we currently work on
     :param s3_usage: boolean, if we use s3 as we then have to upload the new csv file to s3
     :param s3_settings: dictionary, containing information in case of s3 usage
+    :param incremental: boolean, if only the outputs not merged yet are appended, according to the manifest of
+        the previous merge, instead of merging all outputs from scratch
+    :param align_columns: boolean, if the columns of the outputs are matched by name instead of assuming every
+        output has the header of the first one, which merges all outputs from scratch
     return None
     """
     if s3_usage:
@@ -100,30 +360,73 @@ def generate_text_3434(project_name: str, s3_usage: bool, s3_settings: S3Setting
             aws_access_key_id=os.getenv(s3_settings.main_bucket.s3_access_key),
             aws_secret_access_key=os.getenv(s3_settings.main_bucket.s3_secret_key),
             s3_bucket=os.getenv(s3_settings.main_bucket.s3_bucket_name),
+            cache=_return_s3_object_cache(s3_settings, project_paths),
         )
-        # Download infer relevance files
-        prefix_rel_infer = str(Path(s3_settings.prefix) / project_name / "data" / "output" / "RELEVANCE" / "Text")
-        s3c_main.download_files_in_prefix_to_dir(prefix_rel_infer, str(project_paths.path_folder_relevance))
-
-    with open(str(project_paths.path_folder_text_3434) + r"/text_3434.csv", "w") as file_out:
-        very_first = True
-        rel_inf_list = list(glob.iglob(str(project_paths.path_folder_relevance) + r"/*.csv"))
-        if len(rel_inf_list) == 0:
+
+    if s3_usage and s3_settings.merge_text_3434_in_s3:
+        # stream the infer relevance files from the main bucket into text_3434.csv on the interim bucket
+        s3c_interim = S3Communication(
+            s3_endpoint_url=os.getenv(s3_settings.interim_bucket.s3_endpoint),
+            aws_access_key_id=os.getenv(s3_settings.interim_bucket.s3_access_key),
+            aws_secret_access_key=os.getenv(s3_settings.interim_bucket.s3_secret_key),
+            s3_bucket=os.getenv(s3_settings.interim_bucket.s3_bucket_name),
+        )
+        try:
+            count_rel_inf_files = merge_csv_files_in_s3(
+                s3c_main,
+                str(Path(s3_settings.prefix) / project_name / "data" / "output" / "RELEVANCE" / "Text"),
+                s3c_interim,
+                str(Path(s3_settings.prefix) / project_name / "data" / "interim" / "ml"),
+                "text_3434.csv",
+            )
+        except Exception as e:
+            print("Error while merging the relevance inference results in s3.")
+            print(repr(e))
+            return False
+        if count_rel_inf_files == 0:
             print("No relevance inference results found.")
             return False
+        return True
+
+    def rel_inf_files() -> Iterator[str]:
+        # infer relevance files are merged as soon as they are downloaded, while the next ones are downloading
+        filepaths_downloaded = set()
+        if s3_usage:
+            prefix_rel_infer = str(Path(s3_settings.prefix) / project_name / "data" / "output" / "RELEVANCE" / "Text")
+            for result in s3c_main.iter_download_files_in_prefix_to_dir(
+                prefix_rel_infer,
+                str(project_paths.path_folder_relevance),
+                max_workers=s3_settings.max_workers,
+                skip_unchanged=True,
+                include=["*.csv"],
+            ):
+                filepaths_downloaded.add(result.path)
+                yield result.path
+        # unchanged files, which were not downloaded again, and local files
+        for filepath in glob.iglob(str(project_paths.path_folder_relevance) + r"/*.csv"):
+            if filepath not in filepaths_downloaded:
+                yield filepath
+
+    path_file_text_3434 = str(project_paths.path_folder_text_3434) + r"/text_3434.csv"
+    path_file_manifest = str(project_paths.path_folder_text_3434) + "/" + TEXT_3434_MANIFEST_FILENAME
+    try:
+        if align_columns:
+            # the manifest only describes line by line merges
+            Path(path_file_manifest).unlink(missing_ok=True)
+            count_rel_inf_files = merge_csv_files_aligned(rel_inf_files(), path_file_text_3434)
         else:
-            try:
-                for filepath in rel_inf_list:
-                    print(filepath)
-                    with open(filepath) as file_in:
-                        first = True
-                        for line in file_in:
-                            if very_first or not first:
-                                file_out.write(line)
-                            first = False
-                        very_first = False
-            except Exception:
-                return False
+            count_rel_inf_files = merge_csv_files_incremental(
+                rel_inf_files(), path_file_text_3434, path_file_manifest, rebuild=not incremental
+            )
+    except Exception as e:
+        # also raised by the listing and downloads of the relevance inference results, e.g. invalid credentials
+        print("Error while merging the relevance inference results.")
+        print(repr(e))
+        return False
+    if count_rel_inf_files == 0:
+        Path(path_file_manifest).unlink(missing_ok=True)
+        print("No relevance inference results found.")
+        return False
 
     if s3_usage:
         s3c_interim = S3Communication(
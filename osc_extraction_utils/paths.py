@@ -43,6 +43,7 @@ class ProjectPaths(BaseSettings):
 
     path_folder_text_3434: Path = Field(default=Path("interim/ml"))
     path_folder_relevance: Path = Field(default=Path("output/RELEVANCE/Text"))
+    path_folder_s3_cache: Path = Field(default=Path("interim/s3_cache"))
 
     def __init__(self, string_project_name: str, main_settings: MainSettings, path_folder_root: Path, **kwargs):
         super().__init__(**kwargs)
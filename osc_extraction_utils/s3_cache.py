@@ -0,0 +1,146 @@
+"""Local on-disk cache for s3 objects."""
+
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, TypeVar
+
+_T = TypeVar("_T")
+
+
+class S3ObjectCache(object):
+    """
+    Content addressed on-disk cache of s3 objects with a maximum size and least recently used eviction.
+
+    Entries are keyed by the ETag of the object, hence a changed object is never served from the cache and identical
+    objects under different keys are stored only once. The modification time of an entry is its last use, so the
+    eviction order survives restarts. Entries are pinned while read, pinned entries are not evicted.
+    """
+
+    def __init__(self, path_folder_cache: Path | str, max_size_bytes: int = 10 * 1024**3) -> None:
+        """Initialize cache and index the entries already on disk."""
+        self.path_folder_cache = Path(path_folder_cache)
+        self.max_size_bytes = max_size_bytes
+        self.path_folder_cache.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # maps entry names to their sizes, least recently used first
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        # maps entry names to the number of readers using them
+        self._pins: dict[str, int] = {}
+        entries_on_disk = [
+            (path_entry.stat(), path_entry.name)
+            for path_entry in self.path_folder_cache.iterdir()
+            if path_entry.is_file() and not path_entry.name.startswith(".")
+        ]
+        for stat, name in sorted(entries_on_disk, key=lambda entry: entry[0].st_mtime):
+            self._entries[name] = stat.st_size
+
+    @property
+    def size_bytes(self) -> int:
+        """Return the total size of all entries."""
+        with self._lock:
+            return sum(self._entries.values())
+
+    @staticmethod
+    def _entry_name(etag: str) -> str:
+        return hashlib.sha256(etag.strip('"').encode()).hexdigest()
+
+    def get(self, etag: str) -> Path | None:
+        """Return the path of the cached object with the given ETag and mark it as used, or None on a miss."""
+        name = self._entry_name(etag)
+        path_entry = self.path_folder_cache / name
+        with self._lock:
+            if name not in self._entries:
+                return None
+            try:
+                os.utime(path_entry)
+            except FileNotFoundError:
+                # evicted by another process sharing the cache folder
+                del self._entries[name]
+                return None
+            self._entries.move_to_end(name)
+        return path_entry
+
+    def _pin(self, etag: str, download: Callable[[Path], None]) -> str:
+        """Pin the entry of the object with the given ETag, downloading it on a miss, and return its name."""
+        name = self._entry_name(etag)
+        path_entry = self.path_folder_cache / name
+        with self._lock:
+            if name in self._entries:
+                try:
+                    os.utime(path_entry)
+                    self._entries.move_to_end(name)
+                    self._pins[name] = self._pins.get(name, 0) + 1
+                    return name
+                except FileNotFoundError:
+                    # evicted by another process sharing the cache folder
+                    del self._entries[name]
+
+        path_entry_temporary = self.path_folder_cache / f".{name}.{uuid.uuid4().hex}.part"
+        try:
+            download(path_entry_temporary)
+            os.replace(path_entry_temporary, path_entry)
+        finally:
+            path_entry_temporary.unlink(missing_ok=True)
+
+        with self._lock:
+            self._entries[name] = path_entry.stat().st_size
+            self._entries.move_to_end(name)
+            self._pins[name] = self._pins.get(name, 0) + 1
+            self._evict()
+        return name
+
+    def _unpin(self, name: str, evict: bool = True) -> None:
+        with self._lock:
+            self._pins[name] -= 1
+            if not self._pins[name]:
+                del self._pins[name]
+            if evict:
+                # entries pinned during the last download may have kept the cache above its maximum size
+                self._evict()
+
+    def fetch(self, etag: str, download: Callable[[Path], None]) -> Path:
+        """
+        Return the path of the cached object with the given ETag, downloading it on a miss.
+
+        The download function receives a temporary path in the cache folder to write the object to. The entry is
+        not pinned, hence it can be evicted by the next download into the cache, use read for concurrent access.
+        """
+        name = self._pin(etag, download)
+        self._unpin(name, evict=False)
+        return self.path_folder_cache / name
+
+    def read(self, etag: str, download: Callable[[Path], None], read_entry: Callable[[Path], _T]) -> _T:
+        """
+        Return the result of read_entry on the path of the cached object with the given ETag, downloading it on a miss.
+
+        The entry is pinned while it is read, hence other threads using the cache can not evict it. An entry removed
+        by another process sharing the cache folder is downloaded again.
+        """
+        for attempt in range(2):
+            name = self._pin(etag, download)
+            path_entry = self.path_folder_cache / name
+            try:
+                return read_entry(path_entry)
+            except FileNotFoundError:
+                if attempt or path_entry.exists():
+                    raise
+                with self._lock:
+                    self._entries.pop(name, None)
+            finally:
+                self._unpin(name)
+        raise AssertionError("unreachable")
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its maximum size, except for pinned entries."""
+        size_bytes = sum(self._entries.values())
+        for name in list(self._entries):
+            if size_bytes <= self.max_size_bytes:
+                break
+            if name in self._pins:
+                continue
+            size_bytes -= self._entries.pop(name)
+            (self.path_folder_cache / name).unlink(missing_ok=True)
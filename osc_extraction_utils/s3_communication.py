@@ -1,13 +1,173 @@
 """S3 communication tools."""
+
+import fnmatch
+import functools
+import hashlib
+import io
+import json
 import os
 import os.path as osp
 import pathlib
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from enum import Enum
 from io import BytesIO
 from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, TypeVar
 
 import boto3
 import pandas as pd
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from osc_extraction_utils.exceptions import S3DeletionError
+from osc_extraction_utils.s3_cache import S3ObjectCache
+from osc_extraction_utils.s3_compression import (
+    CODEC_METADATA_KEY,
+    S3Codec,
+    compressing_reader,
+    decompressing_reader,
+)
+from osc_extraction_utils.s3_journal import TransferJournal
+from osc_extraction_utils.s3_local import LOCAL_ENDPOINT_SCHEME, LocalS3Client
+
+SYNC_MANIFEST_FILENAME = ".s3_sync_manifest.json"
+UPLOAD_DIGESTS_FILENAME = ".s3_upload_digests.json"
+# maximum number of keys per delete_objects request
+DELETE_BATCH_SIZE = 1000
+
+_s3_clients: dict[tuple, Any] = {}
+_s3_clients_lock = threading.Lock()
+
+
+def get_s3_client(
+    s3_endpoint_url: str | None,
+    aws_access_key_id: str | None,
+    aws_secret_access_key: str | None,
+    max_pool_connections: int = 50,
+):
+    """
+    Return the process wide s3 client for an endpoint and credentials, creating it on first use.
+
+    Clients are thread safe, hence all S3Communication objects for the same endpoint and credentials share one
+    client and with it one pool of keep-alive HTTP connections. An endpoint file:///path/to/root is served by a
+    LocalS3Client storing the buckets in that local directory.
+    """
+    key = (s3_endpoint_url, aws_access_key_id, aws_secret_access_key, max_pool_connections)
+    with _s3_clients_lock:
+        if s3_endpoint_url is not None and s3_endpoint_url.startswith(LOCAL_ENDPOINT_SCHEME):
+            _s3_clients.setdefault(key, LocalS3Client(s3_endpoint_url.removeprefix(LOCAL_ENDPOINT_SCHEME)))
+        elif key not in _s3_clients:
+            _s3_clients[key] = boto3.session.Session().client(
+                "s3",
+                endpoint_url=s3_endpoint_url,
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                config=Config(max_pool_connections=max_pool_connections),
+            )
+        return _s3_clients[key]
+
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _imap_bounded(function: Callable[[_T], _R], items: Iterable[_T], max_workers: int) -> Iterator[_R]:
+    """
+    Apply function to all items in a thread pool and yield the results in order of completion.
+
+    Items are consumed lazily and at most 2 * max_workers of them are pending at any time, hence a slow producer
+    like a paginated listing overlaps with the transfers instead of preceding them, and a slow consumer of the
+    results holds back the submission of further items.
+    """
+    max_workers = max(1, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: set = set()
+        for item in items:
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                # the result of a failed future raises its exception here
+                yield from (future.result() for future in done)
+            pending.add(executor.submit(function, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from (future.result() for future in done)
+
+
+def _map_bounded(function: Callable[[_T], _R], items: Iterable[_T], max_workers: int) -> list[_R]:
+    """Apply function to all items in a thread pool and return the results in order of completion."""
+    return list(_imap_bounded(function, items, max_workers))
+
+
+def _prefetch(items: Iterable[_T], buffer_size: int = 1) -> Iterator[_T]:
+    """
+    Yield the items of an iterable, which are produced by a background thread up to buffer_size items ahead.
+
+    Exceptions of the producer are raised in the consumer. The producer stops once the consumer stops iterating.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    end = object()
+
+    def put(entry: tuple) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as exception:
+            put((end, exception))
+        else:
+            put((end, None))
+
+    threading.Thread(target=produce, name="s3_prefetch", daemon=True).start()
+    try:
+        while True:
+            item, exception = buffer.get()
+            if item is end:
+                if exception is not None:
+                    raise exception
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def _iter_batches(items: Iterable[_T], batch_size: int) -> Iterator[list[_T]]:
+    """Yield lists of up to batch_size consecutive items."""
+    batch: list[_T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _md5_of_file(filepath: Path | str, chunk_size: int = 1024**2) -> str:
+    """Return the hex md5 digest of a file, which is read in chunks."""
+    md5 = hashlib.md5(usedforsecurity=False)
+    with open(filepath, "rb") as f:
+        while chunk := f.read(chunk_size):
+            md5.update(chunk)
+    return md5.hexdigest()
 
 
 class S3FileType(Enum):
@@ -18,11 +178,103 @@ class S3FileType(Enum):
     PARQUET = 2
 
 
+@dataclass
+class TransferResult:
+    """Result of the transfer of a single object between s3 and local disk, or the destination key of a copy."""
+
+    key: str
+    path: str
+    size: int
+    wall_time_seconds: float
+
+
+@dataclass
+class TransferSummary:
+    """Summary of a transfer of several objects between s3 and local disk, or between buckets."""
+
+    object_count: int = 0
+    bytes_transferred: int = 0
+    wall_time_seconds: float = 0.0
+    results: list[TransferResult] = field(default_factory=list)
+    skipped: list[str] = field(default_factory=list)
+
+
+@dataclass
+class DeletionSummary:
+    """Summary of the deletion of several objects from s3."""
+
+    object_count: int = 0
+    bytes_deleted: int = 0
+    wall_time_seconds: float = 0.0
+
+
+class _S3RangeReader(io.RawIOBase):
+    """
+    Seekable read only file object over an s3 object, fetching the bytes of every read with a ranged GET request.
+
+    All requests are conditional on the ETag found on opening, so the reads stay consistent if the object changes.
+    """
+
+    def __init__(self, s3_client, bucket: str | None, key: str) -> None:
+        """Initialize reader."""
+        super().__init__()
+        self._s3_client = s3_client
+        self._bucket = bucket
+        self._key = key
+        head = s3_client.head_object(Bucket=bucket, Key=key)
+        self._size: int = head["ContentLength"]
+        self._etag: str = head["ETag"]
+        self.metadata: dict[str, str] = head.get("Metadata", {})
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self._size + offset
+        else:
+            raise ValueError(f"Received unexpected whence arg {whence}.")
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._size - self._position)
+        if size <= 0:
+            return 0
+        response = self._s3_client.get_object(
+            Bucket=self._bucket,
+            Key=self._key,
+            Range=f"bytes={self._position}-{self._position + size - 1}",
+            IfMatch=self._etag,
+        )
+        data = response["Body"].read()
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
 class S3Communication(object):
     """
     Class to establish communication with a ceph s3 bucket.
 
     It connects with the bucket and provides methods to read and write data in parquet, csv, and json formats.
+    Uploads larger than multipart_threshold bytes are split into parts of multipart_chunksize bytes, which are
+    uploaded by up to multipart_max_concurrency threads and retried individually.
+    The underlying client, with a pool of up to max_pool_connections connections, is shared with all other
+    communicators for the same endpoint and credentials.
+    If a cache is given, downloaded objects are served from it as long as their ETag is unchanged.
+    Csv and json data can be uploaded compressed with one of the S3Codec codecs, which is recorded in the object
+    metadata. Such objects are decompressed on the fly on download.
     """
 
     def __init__(
@@ -31,68 +283,247 @@ class S3Communication(object):
         aws_access_key_id: str | None,
         aws_secret_access_key: str | None,
         s3_bucket: str | None,
+        multipart_threshold: int = 64 * 1024**2,
+        multipart_chunksize: int = 16 * 1024**2,
+        multipart_max_concurrency: int = 8,
+        max_pool_connections: int = 50,
+        cache: S3ObjectCache | None = None,
     ) -> None:
         """Initialize communicator."""
         self.s3_endpoint_url = s3_endpoint_url
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
-        self.s3_resource = boto3.resource(
+        self.s3_client = get_s3_client(
+            self.s3_endpoint_url, self.aws_access_key_id, self.aws_secret_access_key, max_pool_connections
+        )
+        self.bucket = s3_bucket
+        self.cache = cache
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=multipart_max_concurrency,
+        )
+
+    @functools.cached_property
+    def s3_resource(self):
+        """
+        Return a boto3 s3 resource for the endpoint and credentials of the communicator.
+
+        The resource sends its requests through the shared client, hence it uses the same connection pool. It is
+        not available for the local backend.
+        """
+        if isinstance(self.s3_client, LocalS3Client):
+            raise NotImplementedError("The local s3 backend does not provide a boto3 resource.")
+        s3_resource = boto3.session.Session().resource(
             "s3",
             endpoint_url=self.s3_endpoint_url,
             aws_access_key_id=self.aws_access_key_id,
             aws_secret_access_key=self.aws_secret_access_key,
         )
-        self.bucket = s3_bucket
+        s3_resource.meta.client = self.s3_client
+        return s3_resource
+
+    def _upload_fileobj(self, fileobj, prefix, key, metadata: dict[str, str] | None = None) -> None:
+        """Upload binary file object to bucket, as multipart upload if it is larger than the multipart threshold."""
+        self.s3_client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            osp.join(prefix, key),
+            ExtraArgs={"Metadata": metadata} if metadata else None,
+            Config=self.transfer_config,
+        )
+
+    def _open_object(self, key: str, etag: str | None = None) -> BinaryIO:
+        """Open the streamed body of the object at key, decompressed on the fly if it was uploaded with a codec."""
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key, **({"IfMatch": etag} if etag else {}))
+        codec = response.get("Metadata", {}).get(CODEC_METADATA_KEY)
+        if codec is not None:
+            return decompressing_reader(response["Body"], S3Codec(codec))
+        return response["Body"]
+
+    def upload_file_to_s3(
+        self,
+        filepath: Path | str,
+        s3_prefix: str,
+        s3_key: str,
+        metadata: dict[str, str] | None = None,
+        codec: S3Codec | None = None,
+    ) -> None:
+        """
+        Stream file from disk to s3 bucket/prefix/key, optionally with user defined object metadata.
+
+        Files larger than the multipart threshold are uploaded in concurrent parts, each read from disk on demand.
+        If a codec is given, the file is compressed while being uploaded.
+        """
+        if codec is not None:
+            with compressing_reader(open(filepath, "rb"), codec) as f:
+                self._upload_fileobj(
+                    f, s3_prefix, s3_key, metadata={**(metadata or {}), CODEC_METADATA_KEY: codec.value}
+                )
+            return
+        self.s3_client.upload_file(
+            str(filepath),
+            self.bucket,
+            osp.join(s3_prefix, s3_key),
+            ExtraArgs={"Metadata": metadata} if metadata else None,
+            Config=self.transfer_config,
+        )
+
+    def upload_fileobj_to_s3(
+        self, fileobj: BinaryIO, s3_prefix: str, s3_key: str, metadata: dict[str, str] | None = None
+    ) -> None:
+        """
+        Stream a readable binary file object to s3 bucket/prefix/key, optionally with user defined object metadata.
+
+        The size does not need to be known in advance, content larger than the multipart threshold is uploaded in
+        concurrent parts while it is read, holding only the parts in flight in memory.
+        """
+        self._upload_fileobj(fileobj, s3_prefix, s3_key, metadata=metadata)
+
+    def open_file_in_s3(self, s3_prefix: str, s3_key: str) -> BinaryIO:
+        """Open the streamed body of the object at s3 bucket/prefix/key, decompressed if it was uploaded with a codec."""
+        return self._open_object(osp.join(s3_prefix, s3_key))
+
+    def _download_to_file(self, key: str, filepath: Path, etag: str | None = None, size: int | None = None) -> None:
+        """
+        Stream object at key to filepath.
+
+        If an ETag is given, the object is only downloaded if it still has this ETag. Compressed objects are
+        decompressed on the fly. Other objects larger than the multipart threshold are downloaded with the
+        download_file transfer of the client, with concurrent ranged requests instead of a single stream. Objects
+        whose listed size is given and does not exceed the multipart threshold are downloaded with a single GET
+        request, otherwise the path is chosen from a HEAD request before any body is requested. On the local backend,
+        where requests are free, every uncompressed object is copied by download_file with the zero-copy file copy.
+        """
+        extra_args = {"IfMatch": etag} if etag else {}
+        is_local = isinstance(self.s3_client, LocalS3Client)
+        if is_local or size is None or size > self.transfer_config.multipart_threshold:
+            head = self.s3_client.head_object(Bucket=self.bucket, Key=key, **extra_args)
+            if CODEC_METADATA_KEY not in head.get("Metadata", {}) and (
+                is_local or head["ContentLength"] > self.transfer_config.multipart_threshold
+            ):
+                self.s3_client.download_file(
+                    self.bucket, key, str(filepath), ExtraArgs=extra_args or None, Config=self.transfer_config
+                )
+                return
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key, **extra_args)
+        codec = response.get("Metadata", {}).get(CODEC_METADATA_KEY)
+        body = decompressing_reader(response["Body"], S3Codec(codec)) if codec is not None else response["Body"]
+        with body, open(filepath, "wb") as f:
+            shutil.copyfileobj(body, f, self.transfer_config.io_chunksize)
+
+    def _read_cached(
+        self, key: str, read_entry: Callable[[Path], _T], etag: str | None = None, size: int | None = None
+    ) -> _T:
+        """
+        Return the result of read_entry on the path of the object at key in the cache.
+
+        The entry is validated against the current or given ETag, and can not be evicted while it is read.
+        """
+        assert self.cache is not None
+        if etag is None:
+            etag = self.s3_client.head_object(Bucket=self.bucket, Key=key)["ETag"]
+        return self.cache.read(etag, lambda path: self._download_to_file(key, path, etag, size), read_entry)
+
+    def _download_file(self, key: str, filepath: Path | str, etag: str | None = None, size: int | None = None) -> None:
+        """
+        Download object at key to filepath through a temporary file, from the cache if there is one.
+
+        The ETag and size of the object are taken from the listing, if given.
+        """
+        filepath = Path(filepath)
+        path_file_temporary = filepath.with_name(f".{filepath.name}.{uuid.uuid4().hex}.part")
+        try:
+            if self.cache is not None:
+                self._read_cached(key, lambda path: shutil.copyfile(path, path_file_temporary), etag, size)
+            else:
+                self._download_to_file(key, path_file_temporary, size=size)
+            os.replace(path_file_temporary, filepath)
+        finally:
+            path_file_temporary.unlink(missing_ok=True)
+
+    def download_file_from_s3(self, filepath: Path | str, s3_prefix: str, s3_key: str):
+        """
+        Stream file from s3 bucket/prefix/key to filepath on disk.
 
-    def _upload_bytes(self, buffer_bytes, prefix, key):
-        """Upload byte content in buffer to bucket."""
-        s3_object = self.s3_resource.Object(self.bucket, osp.join(prefix, key))
-        status = s3_object.put(Body=buffer_bytes)
-        return status
-
-    def _download_bytes(self, prefix: str, key: str) -> bytes:
-        """Download byte content in bucket/prefix/key to buffer."""
-        buffer = BytesIO()
-        s3_object = self.s3_resource.Object(self.bucket, osp.join(prefix, key))
-        s3_object.download_fileobj(buffer)
-        return buffer.getvalue()
-
-    def upload_file_to_s3(self, filepath: Path | str, s3_prefix: str, s3_key: str):
-        """Read file from disk and upload to s3 bucket/prefix/key."""
-        with open(filepath, "rb") as f:
-            status = self._upload_bytes(f.read(), s3_prefix, s3_key)
-        return status
-
-    def download_file_from_s3(self, filepath: Path, s3_prefix: str, s3_key: str):
-        """Download file from s3 bucket/prefix/key and save it to filepath on disk."""
-        buffer_bytes = self._download_bytes(s3_prefix, s3_key)
-        with open(filepath, "wb") as f:
-            f.write(buffer_bytes)
-
-    def upload_df_to_s3(self, df, s3_prefix, s3_key, filetype=S3FileType.PARQUET, **pd_to_ftype_args):
+        The chunks are written to a hidden temporary file next to filepath, which is atomically renamed to filepath
+        once the download is complete. Hence, memory usage is bounded and filepath never holds a partial file.
+        """
+        self._download_file(osp.join(s3_prefix, s3_key), filepath)
+
+    def upload_df_to_s3(
+        self, df, s3_prefix, s3_key, filetype=S3FileType.PARQUET, codec: S3Codec | None = None, **pd_to_ftype_args
+    ) -> None:
         """
         Take as input the data frame to be uploaded, and the output s3_key.
 
-        Then save the data frame in the defined s3 bucket.
+        Then save the data frame in the defined s3 bucket. The serialized data frame is kept in memory up to the
+        multipart threshold and spooled to a temporary file beyond, from which it is uploaded in parts.
+        Csv and json data is compressed while being uploaded if a codec is given. Parquet files are compressed
+        internally already.
         """
-        buffer = BytesIO()
-        if filetype == S3FileType.CSV:
-            df.to_csv(buffer, **pd_to_ftype_args)
-        elif filetype == S3FileType.JSON:
-            df.to_json(buffer, **pd_to_ftype_args)
-        elif filetype == S3FileType.PARQUET:
-            df.to_parquet(buffer, **pd_to_ftype_args)
-        else:
-            raise ValueError(f"Received unexpected file type arg {filetype}. Can only be one of: {list(S3FileType)})")
+        if codec is not None and filetype == S3FileType.PARQUET:
+            raise ValueError("Received codec arg for parquet file type. Parquet files are compressed internally.")
+        with tempfile.SpooledTemporaryFile(max_size=self.transfer_config.multipart_threshold) as buffer:
+            if filetype == S3FileType.CSV:
+                df.to_csv(buffer, **pd_to_ftype_args)
+            elif filetype == S3FileType.JSON:
+                df.to_json(buffer, **pd_to_ftype_args)
+            elif filetype == S3FileType.PARQUET:
+                df.to_parquet(buffer, **pd_to_ftype_args)
+            else:
+                raise ValueError(
+                    f"Received unexpected file type arg {filetype}. Can only be one of: {list(S3FileType)})"
+                )
 
-        status = self._upload_bytes(buffer.getvalue(), s3_prefix, s3_key)
-        return status
+            buffer.seek(0)
+            if codec is not None:
+                self._upload_fileobj(
+                    compressing_reader(buffer, codec), s3_prefix, s3_key, metadata={CODEC_METADATA_KEY: codec.value}
+                )
+            else:
+                self._upload_fileobj(buffer, s3_prefix, s3_key)
 
     def download_df_from_s3(self, s3_prefix, s3_key, filetype=S3FileType.PARQUET, **pd_read_ftype_args):
-        """Read from s3 and see if the saved data is correct."""
-        buffer_bytes = self._download_bytes(s3_prefix, s3_key)
-        buffer = BytesIO(buffer_bytes)
+        """
+        Read from s3 and see if the saved data is correct.
+
+        Csv files are parsed straight from the (decompressed) response stream.
+        For parquet files read with columns or filters arguments, only the footer and the column chunks of the
+        selected columns in the row groups which may match the filters are fetched, with ranged GET requests.
+        """
+        if self.cache is not None:
+            # an open file is not affected by the eviction of its entry
+            with self._read_cached(osp.join(s3_prefix, s3_key), lambda path: open(path, "rb")) as f:
+                return self._read_df(f, filetype, **pd_read_ftype_args)
+        if filetype == S3FileType.PARQUET and {"columns", "filters"} & pd_read_ftype_args.keys():
+            with _S3RangeReader(self.s3_client, self.bucket, osp.join(s3_prefix, s3_key)) as f:
+                if CODEC_METADATA_KEY not in f.metadata:
+                    return pd.read_parquet(f, engine="pyarrow", **pd_read_ftype_args)
+        with self._open_object(osp.join(s3_prefix, s3_key)) as f:
+            if filetype == S3FileType.CSV:
+                return pd.read_csv(f, **pd_read_ftype_args)
+            return self._read_df(BytesIO(f.read()), filetype, **pd_read_ftype_args)
 
+    def iter_df_chunks_from_s3(
+        self, s3_prefix: str, s3_key: str, chunksize: int = 100_000, **pd_read_csv_args
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Stream csv file from s3 bucket/prefix/key and yield data frames of up to chunksize rows each.
+
+        Only the current chunk and the network buffer are held in memory, independent of the size of the object.
+        """
+        if self.cache is not None:
+            with self._read_cached(osp.join(s3_prefix, s3_key), lambda path: open(path, "rb")) as f:
+                yield from pd.read_csv(f, chunksize=chunksize, **pd_read_csv_args)
+            return
+        with self._open_object(osp.join(s3_prefix, s3_key)) as f:
+            with pd.read_csv(f, chunksize=chunksize, **pd_read_csv_args) as reader:
+                yield from reader
+
+    @staticmethod
+    def _read_df(buffer, filetype: S3FileType, **pd_read_ftype_args) -> pd.DataFrame:
+        """Read data frame of the given file type from a binary file object."""
         if filetype == S3FileType.CSV:
             df = pd.read_csv(buffer, **pd_read_ftype_args)
         elif filetype == S3FileType.JSON:
@@ -103,40 +534,442 @@ class S3Communication(object):
             raise ValueError(f"Received unexpected file type arg {filetype}. Can only be one of: {list(S3FileType)})")
         return df
 
-    def upload_files_in_dir_to_prefix(self, source_dir, s3_prefix):
+    def _is_object_unchanged(self, file: dict | None, key: str, size: int, md5: str | None) -> bool:
+        """
+        Check if the listed object at key has the given size and md5 digest.
+
+        The ETag of an object uploaded in a single part is its md5 digest. For multipart uploads the digest stored in
+        the object metadata on upload is compared instead.
+        """
+        if file is None or file.get("Size") != size:
+            return False
+        etag = file.get("ETag", "").strip('"')
+        if "-" not in etag:
+            return etag == md5
+        metadata = self.s3_client.head_object(Bucket=self.bucket, Key=key).get("Metadata", {})
+        return metadata.get("md5") == md5
+
+    def upload_files_in_dir_to_prefix(
+        self,
+        source_dir,
+        s3_prefix,
+        max_workers: int = 1,
+        skip_unchanged: bool = False,
+        journal_path: Path | str | None = None,
+    ) -> TransferSummary:
         """
         Upload all files in a directory to under the s3 prefix, recursively.
 
-        Excludes hidden files and directories by default.
+        Excludes hidden files and directories by default. With max_workers > 1 the files are uploaded concurrently
+        by a bounded thread pool. With skip_unchanged the md5 digest of every local file is compared to the
+        remote object and identical files are not uploaded again. The digests are kept with the size and
+        modification time of the files in a hidden sidecar file in source_dir, hence only new or modified files are
+        hashed again. With a journal_path every uploaded file is
+        recorded with its size, modification time and md5 digest in a TransferJournal as soon as it is done, and
+        files recorded with the same size and modification time are skipped, hence an interrupted upload resumes
+        where it stopped. The journal does not know the remote objects, hence it is removed once all files are
+        uploaded, and a later upload to a deleted or overwritten prefix starts from scratch.
+        Returns a summary with one result per uploaded file and the keys of the skipped files.
         """
+        time_start = time.perf_counter()
         # convert to pathlib path
         source_dir_pl = pathlib.Path(source_dir)
 
-        # get all files and directories EXCEPT hidden ones
-        upload_files_paths = list(source_dir_pl.rglob("[!.]*"))
-        for fpath in upload_files_paths:
-            self.upload_file_to_s3(fpath, s3_prefix, fpath.name)
+        # get all files EXCEPT hidden ones
+        upload_files_paths = (fpath for fpath in source_dir_pl.rglob("[!.]*") if fpath.is_file())
+
+        remote_files = (
+            {file["Key"]: file for file in self._iter_files_in_prefix(osp.join(s3_prefix, ""))}
+            if skip_unchanged
+            else {}
+        )
+        journal = TransferJournal(journal_path) if journal_path is not None else None
+        skipped: list[str] = []
+        path_digests = osp.join(source_dir, UPLOAD_DIGESTS_FILENAME)
+        digests = self._read_sync_manifest(path_digests) if skip_unchanged or journal is not None else {}
+        digests_changed = False
+
+        def md5_of_file(fpath: Path, stat: os.stat_result) -> str:
+            nonlocal digests_changed
+            name = fpath.relative_to(source_dir_pl).as_posix()
+            entry = digests.get(name)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return entry["md5"]
+            md5 = _md5_of_file(fpath)
+            digests[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "md5": md5}
+            digests_changed = True
+            return md5
+
+        def upload_file(fpath: Path) -> TransferResult | None:
+            time_start_file = time.perf_counter()
+            key = osp.join(s3_prefix, fpath.name)
+            stat = fpath.stat()
+            size = stat.st_size
+            if journal is not None:
+                entry = journal.get(key)
+                if entry is not None and entry.get("size") == size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                    skipped.append(key)
+                    return None
+            md5 = md5_of_file(fpath, stat) if skip_unchanged or journal is not None else None
+            is_unchanged = skip_unchanged and self._is_object_unchanged(remote_files.get(key), key, size, md5)
+            if not is_unchanged:
+                self.upload_file_to_s3(fpath, s3_prefix, fpath.name, metadata={"md5": md5} if md5 else None)
+            if journal is not None:
+                journal.record(key, size=size, mtime_ns=stat.st_mtime_ns, md5=md5)
+            if is_unchanged:
+                skipped.append(key)
+                return None
+            return TransferResult(
+                key=key,
+                path=str(fpath),
+                size=size,
+                wall_time_seconds=time.perf_counter() - time_start_file,
+            )
+
+        try:
+            results = [result for result in _map_bounded(upload_file, upload_files_paths, max_workers) if result]
+        finally:
+            # the digests of the files hashed before a failure are kept as well
+            if digests_changed:
+                self._write_sync_manifest(path_digests, digests)
+        if journal is not None:
+            journal.clear()
+
+        return TransferSummary(
+            object_count=len(results),
+            bytes_transferred=sum(result.size for result in results),
+            wall_time_seconds=time.perf_counter() - time_start,
+            results=results,
+            skipped=skipped,
+        )
+
+    def _iter_files_in_prefix(
+        self, s3_prefix: str, include_directory_markers: bool = False
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield all objects under a prefix, recursively.
+
+        A single flat listing without delimiter is paged through with the maximum page size, hence the number of
+        requests depends on the number of objects instead of the number of sub "directories". The next page is
+        requested in the background while the current one is consumed.
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=self.bucket, Prefix=s3_prefix, PaginationConfig={"PageSize": 1000})
+        for page in _prefetch(pages):
+            # skip "directory" marker objects
+            yield from (
+                file for file in page.get("Contents", []) if include_directory_markers or osp.basename(file["Key"])
+            )
+
+    def iter_objects(
+        self,
+        s3_prefix: str,
+        suffix: str | tuple[str, ...] | None = None,
+        modified_since: datetime | None = None,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield the listing entries of all objects whose key starts with s3_prefix, without reading any object.
+
+        Every entry holds the Key, Size, ETag and LastModified date of an object. Only keys ending with suffix, or
+        one of several suffixes, and only objects modified after modified_since are yielded, a naive datetime is
+        taken as UTC. The glob patterns of include and exclude are matched against the key relative to s3_prefix,
+        only keys matching any include pattern, if given, and no exclude pattern are yielded. Pages are listed
+        lazily, the next page is requested in the background while the current one is consumed.
+        """
+        if modified_since is not None and modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+        include = list(include) if include is not None else None
+        exclude = list(exclude or [])
+        for file in self._iter_files_in_prefix(s3_prefix):
+            if suffix is not None and not file["Key"].endswith(suffix):
+                continue
+            key_relative = file["Key"][len(s3_prefix) :].lstrip("/")
+            if include is not None and not any(fnmatch.fnmatchcase(key_relative, pattern) for pattern in include):
+                continue
+            if any(fnmatch.fnmatchcase(key_relative, pattern) for pattern in exclude):
+                continue
+            if modified_since is not None and file["LastModified"] <= modified_since:
+                continue
+            yield file
+
+    def delete_files_in_prefix(self, s3_prefix: str, max_workers: int = 1) -> DeletionSummary:
+        """
+        Delete all objects under the s3 prefix, recursively, including "directory" marker objects.
+
+        The listing is split into batches of DELETE_BATCH_SIZE keys, each removed by a single delete_objects request.
+        With max_workers > 1 several batches are deleted concurrently while the listing is paged through. Raises an
+        S3DeletionError after all batches were sent if any object could not be deleted.
+        """
+        if not s3_prefix.strip("/"):
+            raise ValueError("Received empty s3_prefix, deleting the whole bucket is not supported.")
+        time_start = time.perf_counter()
+
+        def delete_batch(files: list[dict]) -> tuple[int, int, list[dict]]:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": file["Key"]} for file in files], "Quiet": True},
+            )
+            errors = response.get("Errors", [])
+            failed_keys = {error.get("Key") for error in errors}
+            deleted = [file for file in files if file["Key"] not in failed_keys]
+            return len(deleted), sum(file.get("Size", 0) for file in deleted), errors
 
-    def download_files_in_prefix_to_dir(self, s3_prefix, destination_dir) -> None:
+        files = self._iter_files_in_prefix(osp.join(s3_prefix, ""), include_directory_markers=True)
+        batch_results = _map_bounded(delete_batch, _iter_batches(files, DELETE_BATCH_SIZE), max_workers)
+        errors = [error for _, _, batch_errors in batch_results for error in batch_errors]
+        if errors:
+            raise S3DeletionError(
+                f"Failed to delete {len(errors)} objects under {s3_prefix}, e.g. {errors[0].get('Key')}: "
+                f"{errors[0].get('Code')} {errors[0].get('Message')}"
+            )
+
+        return DeletionSummary(
+            object_count=sum(count for count, _, _ in batch_results),
+            bytes_deleted=sum(size for _, size, _ in batch_results),
+            wall_time_seconds=time.perf_counter() - time_start,
+        )
+
+    @staticmethod
+    def _read_sync_manifest(path_manifest: str) -> dict[str, dict]:
+        """
+        Read the sync manifest, which maps s3 keys to the state of the objects when they were downloaded.
+
+        Also reads the sidecar of the digests of uploaded files. A missing or unreadable file is read as empty.
+        """
+        try:
+            with open(path_manifest) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def _write_sync_manifest(path_manifest: str, manifest: dict[str, dict]) -> None:
+        """Write the sync manifest atomically."""
+        path_manifest_temporary = f"{path_manifest}.{uuid.uuid4().hex}.part"
+        with open(path_manifest_temporary, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(path_manifest_temporary, path_manifest)
+
+    @staticmethod
+    def _sync_manifest_entry(file: dict) -> dict:
+        """Return the state of a listed object which is compared between sync runs."""
+        last_modified = file.get("LastModified")
+        return {
+            "etag": file.get("ETag"),
+            "size": file.get("Size"),
+            "last_modified": last_modified.isoformat() if last_modified is not None else None,
+        }
+
+    @staticmethod
+    def _is_local_copy_intact(dest_pathname: str, entry: dict, file: dict) -> bool:
+        """
+        Return whether the local copy of a listed object has the size recorded in its manifest or journal entry.
+
+        The local size differs from the listed size of objects uploaded with a codec, which are stored decompressed.
+        Entries without a local size were written for uncompressed objects.
+        """
+        return osp.isfile(dest_pathname) and osp.getsize(dest_pathname) == entry.get("local_size", file.get("Size"))
+
+    def download_files_in_prefix_to_dir(
+        self,
+        s3_prefix,
+        destination_dir,
+        max_workers: int = 1,
+        skip_unchanged: bool = False,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        modified_since: datetime | None = None,
+        journal_path: Path | str | None = None,
+    ) -> TransferSummary:
         """
         Download all files under a prefix to a directory.
 
-        Modified from original code here: https://stackoverflow.com/a/33350380
-        """
-        paginator = self.s3_resource.meta.client.get_paginator("list_objects")
-        for result in paginator.paginate(Bucket=self.bucket, Delimiter="/", Prefix=s3_prefix):
-            # download all files in the sub "directory", if any
-            if result.get("CommonPrefixes") is not None:
-                for subdir in result.get("CommonPrefixes"):
-                    self.download_files_in_prefix_to_dir(
-                        subdir.get("Prefix"),
-                        destination_dir,
-                    )
-            # download files at the root of this prefix
-            for file in result.get("Contents", []):
-                dest_filename = osp.basename(file.get("Key"))
-                if dest_filename:
-                    dest_pathname = osp.join(destination_dir, dest_filename)
-                    if not osp.exists(osp.dirname(dest_pathname)):
-                        os.makedirs(osp.dirname(dest_pathname))
-                    self.download_file_from_s3(dest_pathname, s3_prefix, dest_filename)
+        See iter_download_files_in_prefix_to_dir for the keyword arguments. Returns a summary with the number of
+        objects, the number of bytes and the wall time of the transfer.
+        """
+        time_start = time.perf_counter()
+        skipped: list[str] = []
+        results = list(
+            self.iter_download_files_in_prefix_to_dir(
+                s3_prefix,
+                destination_dir,
+                max_workers=max_workers,
+                skip_unchanged=skip_unchanged,
+                include=include,
+                exclude=exclude,
+                modified_since=modified_since,
+                journal_path=journal_path,
+                skipped=skipped,
+            )
+        )
+
+        return TransferSummary(
+            object_count=len(results),
+            bytes_transferred=sum(result.size for result in results),
+            wall_time_seconds=time.perf_counter() - time_start,
+            results=results,
+            skipped=skipped,
+        )
+
+    def iter_download_files_in_prefix_to_dir(
+        self,
+        s3_prefix,
+        destination_dir,
+        max_workers: int = 1,
+        skip_unchanged: bool = False,
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] | None = None,
+        modified_since: datetime | None = None,
+        journal_path: Path | str | None = None,
+        skipped: list[str] | None = None,
+    ) -> Iterator[TransferResult]:
+        """
+        Download all files under a prefix to a directory and yield the result of every file as soon as it is done.
+
+        The caller can process each file while the others are still downloading, at most 2 * max_workers downloads
+        are pending or done but not consumed yet.
+
+        The include and exclude glob patterns and modified_since select the objects at listing time, as in
+        iter_objects, other objects are neither downloaded nor reported as skipped.
+
+        With max_workers > 1 the files are downloaded concurrently by a bounded thread pool sharing one client.
+        The downloads are scheduled while the listing is paged through.
+        With skip_unchanged the ETag, size and last modified date of every object are compared against the sidecar
+        manifest in destination_dir, written by the previous sync, and only new or changed objects, or objects
+        whose local copy is missing, are downloaded.
+        With a journal_path every downloaded object is recorded with its size and ETag in a TransferJournal as soon
+        as it is done, and objects recorded with the same size and ETag whose local copy is intact are skipped,
+        hence an interrupted download resumes where it stopped.
+        The keys of the skipped objects are appended to skipped, if given. The sync manifest is written once all
+        files are done.
+        """
+        path_manifest = osp.join(destination_dir, SYNC_MANIFEST_FILENAME)
+        manifest = self._read_sync_manifest(path_manifest) if skip_unchanged else {}
+        journal = TransferJournal(journal_path) if journal_path is not None else None
+        skipped = skipped if skipped is not None else []
+
+        def journaled_entry(file: dict) -> dict | None:
+            entry = journal.get(file["Key"]) if journal is not None else None
+            dest_pathname = osp.join(destination_dir, osp.basename(file["Key"]))
+            if (
+                entry is not None
+                and entry.get("etag") == file.get("ETag")
+                and entry.get("size") == file.get("Size")
+                and self._is_local_copy_intact(dest_pathname, entry, file)
+            ):
+                return entry
+            return None
+
+        def is_unchanged(file: dict) -> bool:
+            entry = manifest.get(file["Key"])
+            dest_pathname = osp.join(destination_dir, osp.basename(file["Key"]))
+            return (
+                entry is not None
+                and {name: entry.get(name) for name in ("etag", "size", "last_modified")}
+                == self._sync_manifest_entry(file)
+                and self._is_local_copy_intact(dest_pathname, entry, file)
+            )
+
+        def files_to_download() -> Iterator[dict]:
+            files = self.iter_objects(s3_prefix, modified_since=modified_since, include=include, exclude=exclude)
+            for file in files:
+                if skip_unchanged and is_unchanged(file):
+                    skipped.append(file["Key"])
+                elif (entry := journaled_entry(file)) is not None:
+                    skipped.append(file["Key"])
+                    local_size = entry.get("local_size", file.get("Size"))
+                    manifest[file["Key"]] = {**self._sync_manifest_entry(file), "local_size": local_size}
+                else:
+                    yield file
+
+        def download_file(file: dict) -> TransferResult:
+            time_start_file = time.perf_counter()
+            dest_filename = osp.basename(file["Key"])
+            dest_pathname = osp.join(destination_dir, dest_filename)
+            os.makedirs(destination_dir, exist_ok=True)
+            self._download_file(file["Key"], dest_pathname, etag=file.get("ETag"), size=file.get("Size"))
+            # the size on disk, which is the decompressed size of objects uploaded with a codec
+            local_size = osp.getsize(dest_pathname)
+            manifest[file["Key"]] = {**self._sync_manifest_entry(file), "local_size": local_size}
+            if journal is not None:
+                journal.record(file["Key"], size=file.get("Size"), etag=file.get("ETag"), local_size=local_size)
+            return TransferResult(
+                key=file["Key"],
+                path=dest_pathname,
+                size=local_size,
+                wall_time_seconds=time.perf_counter() - time_start_file,
+            )
+
+        downloaded_any = False
+        for result in _imap_bounded(download_file, files_to_download(), max_workers):
+            downloaded_any = True
+            yield result
+        if skip_unchanged and (downloaded_any or journal is not None):
+            self._write_sync_manifest(path_manifest, manifest)
+
+    def _copy_object(self, key: str, destination: "S3Communication", destination_key: str) -> None:
+        """
+        Copy the object at key to destination_key in the bucket of destination, together with its metadata.
+
+        If both buckets are served by the same endpoint the object is copied server side, with concurrent
+        upload_part_copy requests above the multipart threshold, so the bytes never pass through this process. If
+        the endpoints differ or the destination credentials may not read the source bucket, the object is streamed
+        from one bucket to the other instead.
+        """
+        if self.s3_client.meta.endpoint_url == destination.s3_client.meta.endpoint_url:
+            try:
+                destination.s3_client.copy(
+                    {"Bucket": self.bucket, "Key": key},
+                    destination.bucket,
+                    destination_key,
+                    SourceClient=self.s3_client,
+                    Config=destination.transfer_config,
+                )
+                return
+            except ClientError as exception:
+                if exception.response.get("Error", {}).get("Code") not in ("AccessDenied", "403"):
+                    raise
+        response = self.s3_client.get_object(Bucket=self.bucket, Key=key)
+        with response["Body"] as body:
+            destination._upload_fileobj(body, "", destination_key, metadata=response.get("Metadata"))
+
+    def copy_file_to_s3(
+        self, s3_prefix: str, s3_key: str, destination: "S3Communication", destination_prefix: str, destination_key: str
+    ) -> None:
+        """Copy the object at s3 bucket/prefix/key to the bucket of destination at prefix/key."""
+        self._copy_object(osp.join(s3_prefix, s3_key), destination, osp.join(destination_prefix, destination_key))
+
+    def copy_files_in_prefix_to_s3(
+        self, s3_prefix, destination: "S3Communication", destination_prefix, max_workers: int = 1
+    ) -> TransferSummary:
+        """
+        Copy all objects under a prefix to under the destination prefix in the bucket of destination, recursively.
+
+        The keys relative to the prefix are kept. With max_workers > 1 the objects are copied concurrently by a
+        bounded thread pool while the listing is paged through. Returns a summary with one result per copied object,
+        whose path is the destination key.
+        """
+        time_start = time.perf_counter()
+        s3_prefix = osp.join(s3_prefix, "")
+
+        def copy_file(file: dict) -> TransferResult:
+            time_start_file = time.perf_counter()
+            destination_key = osp.join(destination_prefix, file["Key"][len(s3_prefix) :])
+            self._copy_object(file["Key"], destination, destination_key)
+            return TransferResult(
+                key=file["Key"],
+                path=destination_key,
+                size=file.get("Size", 0),
+                wall_time_seconds=time.perf_counter() - time_start_file,
+            )
+
+        results = _map_bounded(copy_file, self._iter_files_in_prefix(s3_prefix), max_workers)
+
+        return TransferSummary(
+            object_count=len(results),
+            bytes_transferred=sum(result.size for result in results),
+            wall_time_seconds=time.perf_counter() - time_start,
+            results=results,
+        )
@@ -0,0 +1,87 @@
+"""Streaming compression of s3 object bodies."""
+
+import io
+import zlib
+from enum import Enum
+from typing import IO, Callable
+
+CODEC_METADATA_KEY = "codec"
+
+
+class S3Codec(Enum):
+    """Enum to describe possible compression codecs of objects that S3Communication can handle."""
+
+    GZIP = "gzip"
+    ZSTD = "zstd"
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as exception:
+        raise ImportError(
+            "The zstandard package is required for zstd compression: pip install zstandard"
+        ) from exception
+    return zstandard
+
+
+class _TransformingReader(io.RawIOBase):
+    """Read only file object passing the bytes read from a source file object through a (de)compressor."""
+
+    def __init__(
+        self,
+        source: IO[bytes],
+        transform: Callable[[bytes], bytes],
+        flush: Callable[[], bytes],
+        chunk_size: int = 1024**2,
+    ) -> None:
+        """Initialize reader."""
+        super().__init__()
+        self._source = source
+        self._transform = transform
+        self._flush = flush
+        self._chunk_size = chunk_size
+        self._pending = memoryview(b"")
+        self._source_exhausted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._source_exhausted:
+            chunk = self._source.read(self._chunk_size)
+            if chunk:
+                self._pending = memoryview(self._transform(chunk))
+            else:
+                self._pending = memoryview(self._flush())
+                self._source_exhausted = True
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        self._source.close()
+        super().close()
+
+
+def compressing_reader(source: IO[bytes], codec: S3Codec) -> io.BufferedReader:
+    """Return a file object reading the compressed bytes of source, which is compressed while being read."""
+    if codec == S3Codec.GZIP:
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    elif codec == S3Codec.ZSTD:
+        compressor = _import_zstandard().ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f"Received unexpected codec arg {codec}. Can only be one of: {list(S3Codec)})")
+    return io.BufferedReader(_TransformingReader(source, compressor.compress, compressor.flush))
+
+
+def decompressing_reader(source: IO[bytes], codec: S3Codec) -> io.BufferedReader:
+    """Return a file object reading the decompressed bytes of source, which is decompressed while being read."""
+    if codec == S3Codec.GZIP:
+        decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    elif codec == S3Codec.ZSTD:
+        decompressor = _import_zstandard().ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"Received unexpected codec arg {codec}. Can only be one of: {list(S3Codec)})")
+    return io.BufferedReader(_TransformingReader(source, decompressor.decompress, decompressor.flush))
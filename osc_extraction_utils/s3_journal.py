@@ -0,0 +1,59 @@
+"""On-disk journal of completed s3 transfers."""
+
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+
+class TransferJournal(object):
+    """
+    Append-only JSON lines journal of the objects a transfer has completed, keyed by their s3 key.
+
+    Every completed object is appended as one line as soon as it is done, hence the journal survives a transfer
+    which is killed halfway and the next run can skip the objects recorded with a matching size and checksum. A
+    line cut short by the kill is ignored, later lines for the same key replace earlier ones.
+    """
+
+    def __init__(self, path_journal: Path | str) -> None:
+        """Initialize journal and read the entries already on disk."""
+        self.path_journal = Path(path_journal)
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        # a line cut short has no line break, which is added before the next entry
+        self._line_open = False
+        try:
+            with open(self.path_journal) as f:
+                for line in f:
+                    self._line_open = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(entry, dict) and "key" in entry:
+                        self._entries[entry["key"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Return the last entry recorded for key, or None if the object was not transferred yet."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def record(self, key: str, **entry: Any) -> None:
+        """Append the entry of the completed object at key to the journal."""
+        entry = {"key": key, **entry}
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self._lock:
+            self.path_journal.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path_journal, "a") as f:
+                f.write("\n" + line if self._line_open else line)
+            self._line_open = False
+            self._entries[key] = entry
+
+    def clear(self) -> None:
+        """Remove the journal from disk and forget all entries, e.g. once the transfer is complete."""
+        with self._lock:
+            self.path_journal.unlink(missing_ok=True)
+            self._line_open = False
+            self._entries.clear()
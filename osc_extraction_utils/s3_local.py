@@ -0,0 +1,270 @@
+"""Local directory stand-in for the s3 client."""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, BinaryIO, Callable, Iterator
+
+from botocore.exceptions import ClientError
+
+LOCAL_ENDPOINT_SCHEME = "file://"
+
+
+def _client_error(code: str, message: str, operation_name: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": message}}, operation_name)
+
+
+class _LocalListObjectsV2Paginator(object):
+    """Paginator over the objects of a LocalS3Client, yielding pages shaped like list_objects_v2 responses."""
+
+    def __init__(self, client: "LocalS3Client") -> None:
+        self._client = client
+
+    def paginate(
+        self, Bucket: str, Prefix: str = "", PaginationConfig: dict | None = None, **kwargs
+    ) -> Iterator[dict[str, Any]]:
+        page_size = (PaginationConfig or {}).get("PageSize") or 1000
+        contents: list[dict[str, Any]] = []
+        for key in self._client._iter_keys(Bucket, Prefix):
+            head = self._client.head_object(Bucket=Bucket, Key=key)
+            contents.append(
+                {"Key": key, "Size": head["ContentLength"], "ETag": head["ETag"], "LastModified": head["LastModified"]}
+            )
+            if len(contents) == page_size:
+                yield {"Contents": contents, "KeyCount": len(contents)}
+                contents = []
+        if contents:
+            yield {"Contents": contents, "KeyCount": len(contents)}
+
+
+class LocalS3Client(object):
+    """
+    Stand-in for the boto3 s3 client which stores the objects of every bucket in a local directory.
+
+    Implements the part of the client interface S3Communication uses, including the error codes of failed requests,
+    hence the s3 code paths run unchanged on a single node, offline or in benchmarks without network I/O. The object
+    bucket/key is the file root/bucket/key, its ETag and user metadata are kept in a sidecar file under
+    root/.s3_local. Objects are always written to a temporary file which then replaces the object, hence files in the
+    store are never modified in place: copies within the store are hardlinks, and uploads and downloads of files use
+    the zero-copy file copy of the operating system. Keys of "directory" marker objects are not stored.
+    """
+
+    def __init__(self, path_folder_root: Path | str) -> None:
+        """Initialize client."""
+        self.path_folder_root = Path(path_folder_root)
+        self.path_folder_state = self.path_folder_root / ".s3_local"
+        self.meta = SimpleNamespace(endpoint_url=f"{LOCAL_ENDPOINT_SCHEME}{self.path_folder_root}")
+
+    def _path_object(self, bucket: str, key: str) -> Path:
+        parts = key.split("/")
+        if not bucket or bucket.startswith(".") or any(part in (".", "..") for part in parts):
+            raise _client_error("InvalidArgument", f"Invalid bucket {bucket} or key {key}.", "PathResolution")
+        return self.path_folder_root / bucket / key
+
+    def _path_sidecar(self, bucket: str, key: str) -> Path:
+        return self.path_folder_state / "objects" / bucket / f"{key}.json"
+
+    def _iter_keys(self, bucket: str, prefix: str) -> Iterator[str]:
+        """Yield the keys in bucket starting with prefix in lexicographic order."""
+        path_folder_bucket = self.path_folder_root / bucket
+        # only the deepest directory containing all matching keys is walked
+        path_folder_start = path_folder_bucket / prefix.rpartition("/")[0]
+        keys = []
+        for path_folder, folder_names, file_names in os.walk(path_folder_start):
+            folder_names[:] = [name for name in folder_names if not name.startswith(".")]
+            for file_name in file_names:
+                if file_name.startswith("."):
+                    continue
+                key = (Path(path_folder) / file_name).relative_to(path_folder_bucket).as_posix()
+                if key.startswith(prefix):
+                    keys.append(key)
+        yield from sorted(keys)
+
+    @staticmethod
+    def _md5_of_file(path: Path) -> str:
+        md5 = hashlib.md5(usedforsecurity=False)
+        with open(path, "rb") as f:
+            while chunk := f.read(1024**2):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    def _read_state(self, bucket: str, key: str, operation_name: str) -> tuple[os.stat_result, dict[str, Any]]:
+        """Return the stat of the object file and its sidecar state, which is rebuilt if the file was replaced."""
+        path_object = self._path_object(bucket, key)
+        try:
+            stat = path_object.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            raise _client_error("404", f"Key {key} does not exist in bucket {bucket}.", operation_name)
+        if not path_object.is_file():
+            raise _client_error("404", f"Key {key} does not exist in bucket {bucket}.", operation_name)
+        try:
+            with open(self._path_sidecar(bucket, key)) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            state = {}
+        if state.get("size") != stat.st_size or state.get("mtime_ns") != stat.st_mtime_ns:
+            # written to the directory without the client, the state is stored so the file is hashed only once
+            state = {"etag": f'"{self._md5_of_file(path_object)}"', "metadata": {}}
+            try:
+                self._write_sidecar(bucket, key, stat, state)
+            except OSError:
+                # e.g. a read only store
+                pass
+        return stat, state
+
+    def _write_object(
+        self,
+        bucket: str,
+        key: str,
+        write: Callable[[Path], None],
+        metadata: dict[str, str] | None,
+        etag: str | None = None,
+    ) -> None:
+        """
+        Write the object at key with the write function, which receives a temporary path, and its metadata.
+
+        The ETag is computed from the written file unless it is given.
+        """
+        if key.endswith("/"):
+            self._path_object(bucket, key).mkdir(parents=True, exist_ok=True)
+            return
+        path_object = self._path_object(bucket, key)
+        path_folder_temporary = self.path_folder_state / "tmp"
+        path_folder_temporary.mkdir(parents=True, exist_ok=True)
+        path_object_temporary = path_folder_temporary / uuid.uuid4().hex
+        try:
+            write(path_object_temporary)
+            etag = etag or f'"{self._md5_of_file(path_object_temporary)}"'
+            path_object.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path_object_temporary, path_object)
+        finally:
+            path_object_temporary.unlink(missing_ok=True)
+        stat = path_object.stat()
+        self._write_sidecar(bucket, key, stat, {"etag": etag, "metadata": metadata or {}})
+
+    def _write_sidecar(self, bucket: str, key: str, stat: os.stat_result, state: dict[str, Any]) -> None:
+        path_sidecar = self._path_sidecar(bucket, key)
+        path_sidecar.parent.mkdir(parents=True, exist_ok=True)
+        path_sidecar_temporary = path_sidecar.with_name(f".{path_sidecar.name}.{uuid.uuid4().hex}.part")
+        with open(path_sidecar_temporary, "w") as f:
+            json.dump({**state, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}, f)
+        os.replace(path_sidecar_temporary, path_sidecar)
+
+    def get_paginator(self, operation_name: str) -> _LocalListObjectsV2Paginator:
+        """Return the paginator of operation_name, only list_objects_v2 is supported."""
+        if operation_name != "list_objects_v2":
+            raise NotImplementedError(f"Received unsupported paginator {operation_name}.")
+        return _LocalListObjectsV2Paginator(self)
+
+    def head_object(self, Bucket: str, Key: str, IfMatch: str | None = None, **kwargs) -> dict[str, Any]:
+        """Return the size, ETag, modification time and user metadata of an object."""
+        stat, state = self._read_state(Bucket, Key, "HeadObject")
+        if IfMatch is not None and IfMatch.strip('"') != state["etag"].strip('"'):
+            raise _client_error("412", "Precondition Failed", "HeadObject")
+        return {
+            "ContentLength": stat.st_size,
+            "ETag": state["etag"],
+            "LastModified": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+            "Metadata": dict(state["metadata"]),
+        }
+
+    def get_object(
+        self, Bucket: str, Key: str, Range: str | None = None, IfMatch: str | None = None, **kwargs
+    ) -> dict[str, Any]:
+        """Return the metadata and the body of an object, or of the byte range of it if given."""
+        response = self.head_object(Bucket=Bucket, Key=Key)
+        if IfMatch is not None and IfMatch.strip('"') != response["ETag"].strip('"'):
+            raise _client_error("PreconditionFailed", "Precondition Failed", "GetObject")
+        body = open(self._path_object(Bucket, Key), "rb")
+        if Range is None:
+            return {**response, "Body": body}
+        start, _, end = Range.removeprefix("bytes=").partition("-")
+        if int(start) >= response["ContentLength"]:
+            body.close()
+            raise _client_error("InvalidRange", "The requested range is not satisfiable", "GetObject")
+        end_inclusive = min(int(end), response["ContentLength"] - 1) if end else response["ContentLength"] - 1
+        with body:
+            body.seek(int(start))
+            content = body.read(end_inclusive - int(start) + 1)
+        return {**response, "Body": BytesIO(content), "ContentLength": len(content)}
+
+    def put_object(
+        self, Bucket: str, Key: str, Body: bytes | BinaryIO = b"", Metadata: dict[str, str] | None = None, **kwargs
+    ) -> dict[str, Any]:
+        """Write an object from bytes or a binary file object."""
+        body = BytesIO(Body) if isinstance(Body, bytes) else Body
+        self.upload_fileobj(body, Bucket, Key, ExtraArgs={"Metadata": Metadata} if Metadata else None)
+        return {"ETag": self.head_object(Bucket=Bucket, Key=Key)["ETag"]} if not Key.endswith("/") else {}
+
+    def upload_fileobj(self, Fileobj: BinaryIO, Bucket: str, Key: str, ExtraArgs: dict | None = None, **kwargs) -> None:
+        """Write an object from a binary file object."""
+        def write(path: Path) -> None:
+            with open(path, "wb") as f:
+                shutil.copyfileobj(Fileobj, f, 1024**2)
+
+        self._write_object(Bucket, Key, write, (ExtraArgs or {}).get("Metadata"))
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, ExtraArgs: dict | None = None, **kwargs) -> None:
+        """Write an object from a file."""
+        def write(path: Path) -> None:
+            shutil.copyfile(Filename, path)
+
+        self._write_object(Bucket, Key, write, (ExtraArgs or {}).get("Metadata"))
+
+    def download_fileobj(self, Bucket: str, Key: str, Fileobj: BinaryIO, **kwargs) -> None:
+        """Write an object to a binary file object."""
+        with self.get_object(Bucket=Bucket, Key=Key)["Body"] as body:
+            shutil.copyfileobj(body, Fileobj, 1024**2)
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, ExtraArgs: dict | None = None, **kwargs) -> None:
+        """Copy an object to a file."""
+        self.head_object(Bucket=Bucket, Key=Key, IfMatch=(ExtraArgs or {}).get("IfMatch"))
+        shutil.copyfile(self._path_object(Bucket, Key), Filename)
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs) -> dict[str, Any]:
+        """Delete an object, which may not exist."""
+        self._path_object(Bucket, Key).unlink(missing_ok=True)
+        self._path_sidecar(Bucket, Key).unlink(missing_ok=True)
+        return {}
+
+    def delete_objects(self, Bucket: str, Delete: dict, **kwargs) -> dict[str, Any]:
+        """Delete several objects and report the keys which could not be deleted."""
+        deleted, errors = [], []
+        for object_to_delete in Delete["Objects"]:
+            key = object_to_delete["Key"]
+            try:
+                # "directory" marker objects are not stored
+                if not key.endswith("/"):
+                    self.delete_object(Bucket=Bucket, Key=key)
+                deleted.append({"Key": key})
+            except (OSError, ClientError) as exception:
+                errors.append({"Key": key, "Code": "InternalError", "Message": str(exception)})
+        return {"Errors": errors} if errors else {"Deleted": [] if Delete.get("Quiet") else deleted}
+
+    def copy_object(self, Bucket: str, Key: str, CopySource: dict, **kwargs) -> dict[str, Any]:
+        """Copy an object within the store."""
+        self.copy(CopySource, Bucket, Key)
+        return {"CopyObjectResult": {"ETag": self.head_object(Bucket=Bucket, Key=Key)["ETag"]}}
+
+    def copy(
+        self, CopySource: dict, Bucket: str, Key: str, SourceClient: "LocalS3Client | None" = None, **kwargs
+    ) -> None:
+        """Copy an object from this store or the store of SourceClient, as a hardlink if possible."""
+        source_client = SourceClient if isinstance(SourceClient, LocalS3Client) else self
+        head = source_client.head_object(Bucket=CopySource["Bucket"], Key=CopySource["Key"])
+        path_source = source_client._path_object(CopySource["Bucket"], CopySource["Key"])
+
+        def write(path: Path) -> None:
+            try:
+                os.link(path_source, path)
+            except OSError:
+                # e.g. a store on another file system
+                shutil.copyfile(path_source, path)
+
+        self._write_object(Bucket, Key, write, head["Metadata"], etag=head["ETag"])
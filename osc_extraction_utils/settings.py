@@ -197,6 +197,10 @@ class S3Settings(Settings, BaseSettings):
     prefix: str = Field(default="corporate_data_extraction_projects")
     main_bucket: MainBucketSettings = Field(default=MainBucketSettings())
     interim_bucket: InterimBucketSettings = Field(default=InterimBucketSettings())
+    max_workers: int = Field(default=8)
+    merge_text_3434_in_s3: bool = Field(default=False)
+    cache_enabled: bool = Field(default=False)
+    cache_max_size_bytes: int = Field(default=10 * 1024**3)
 
 
 class MainSettings(Settings, BaseSettings):
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pandas as pd
+
+from osc_extraction_utils.async_s3_communication import AsyncS3Communication
+from osc_extraction_utils.s3_communication import S3Communication, S3FileType
+
+
+def test_download_df_from_s3():
+    mocked_s3_communication = Mock(spec=S3Communication)
+    mocked_s3_communication.download_df_from_s3.return_value = pd.DataFrame({"a": [1]})
+
+    async def download():
+        async with AsyncS3Communication(mocked_s3_communication) as async_s3_communication:
+            return await async_s3_communication.download_df_from_s3("prefix", "file.csv", filetype=S3FileType.CSV)
+
+    df = asyncio.run(download())
+
+    assert df.to_dict("list") == {"a": [1]}
+    mocked_s3_communication.download_df_from_s3.assert_called_once_with("prefix", "file.csv", filetype=S3FileType.CSV)
+
+
+def test_transfers_are_bounded_by_max_concurrency():
+    lock = threading.Lock()
+    calls_running: list[int] = [0, 0]
+
+    def download_file_from_s3(filepath, s3_prefix, s3_key):
+        with lock:
+            calls_running[0] += 1
+            calls_running[1] = max(calls_running)
+        time.sleep(0.01)
+        with lock:
+            calls_running[0] -= 1
+
+    mocked_s3_communication = Mock(spec=S3Communication)
+    mocked_s3_communication.download_file_from_s3.side_effect = download_file_from_s3
+
+    async def download_all():
+        async with AsyncS3Communication(mocked_s3_communication, max_concurrency=3) as async_s3_communication:
+            await asyncio.gather(
+                *(
+                    async_s3_communication.download_file_from_s3(Path(f"file_{i}"), "prefix", f"file_{i}")
+                    for i in range(12)
+                )
+            )
+
+    asyncio.run(download_all())
+
+    assert mocked_s3_communication.download_file_from_s3.call_count == 12
+    assert 1 < calls_running[1] <= 3
+
+
+def test_list_files_in_prefix():
+    mocked_s3_communication = Mock(spec=S3Communication)
+    mocked_s3_communication.iter_objects.return_value = iter([{"Key": "prefix/file.csv"}])
+
+    async def list_files():
+        async with AsyncS3Communication(mocked_s3_communication) as async_s3_communication:
+            return await async_s3_communication.list_files_in_prefix("prefix")
+
+    assert asyncio.run(list_files()) == [{"Key": "prefix/file.csv"}]
+
+
+def test_exit_does_not_block_event_loop():
+    transfer_started = threading.Event()
+
+    def download_file_from_s3(filepath, s3_prefix, s3_key):
+        transfer_started.set()
+        time.sleep(0.2)
+
+    mocked_s3_communication = Mock(spec=S3Communication)
+    mocked_s3_communication.download_file_from_s3.side_effect = download_file_from_s3
+    ticks: list[float] = []
+
+    async def tick():
+        while len(ticks) < 5:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def download_and_exit():
+        async_s3_communication = AsyncS3Communication(mocked_s3_communication)
+        task = asyncio.ensure_future(async_s3_communication.download_file_from_s3(Path("file"), "prefix", "file"))
+        await asyncio.get_running_loop().run_in_executor(None, transfer_started.wait)
+        ticker = asyncio.ensure_future(tick())
+        await async_s3_communication.__aexit__(None, None, None)
+        await asyncio.gather(task, ticker)
+        return time.perf_counter()
+
+    time_end = asyncio.run(download_and_exit())
+
+    # the ticker kept running while the exit waited for the transfer
+    assert len(ticks) == 5
+    assert ticks[-1] < time_end - 0.05
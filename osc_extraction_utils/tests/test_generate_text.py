@@ -35,6 +35,7 @@ def test_generate_text_with_s3(prerequisites_generate_text, path_folder_temporar
     }
 
     with patch("osc_extraction_utils.merger.S3Communication", Mock(spec=S3Communication)) as mocked_s3:
+        mocked_s3.return_value.iter_download_files_in_prefix_to_dir.return_value = iter([])
         generate_text_3434(project_name, True, S3Settings(**mocked_s3_settings), project_paths=project_paths)
 
     # check for calls
@@ -43,6 +44,7 @@ def test_generate_text_with_s3(prerequisites_generate_text, path_folder_temporar
         aws_access_key_id="S3_ACCESS_MAIN",
         aws_secret_access_key="S3_SECRET_MAIN",
         s3_bucket="S3_NAME_MAIN",
+        cache=None,
     )
     mocked_s3.assert_any_call(
         s3_endpoint_url="S3_END_INTERIM",
@@ -52,7 +54,7 @@ def test_generate_text_with_s3(prerequisites_generate_text, path_folder_temporar
     )
 
     call_list = [call[0] for call in mocked_s3.mock_calls]
-    assert any([call for call in call_list if "download_files_in_prefix_to_dir" in call])
+    assert any([call for call in call_list if "iter_download_files_in_prefix_to_dir" in call])
     assert any([call for call in call_list if "upload_file_to_s3" in call])
 
 
@@ -93,6 +95,39 @@ def test_generate_text_no_s3(
                 assert line_content.rstrip() in strings_expected
 
 
+def test_generate_text_align_columns(
+    prerequisites_generate_text, path_folder_temporary: Path, project_paths: ProjectPaths, s3_settings: S3Settings
+):
+    """Tests if the columns of the files in the folder relevance are matched by name
+    Requesting prerequisites_generate_text automatically (autouse)
+
+    :param path_folder_temporary: Requesting the path_folder_temporary fixture
+    :type path_folder_temporary: Path
+    """
+    (path_folder_temporary / "relevance" / "5_test.csv").write_text("PAGE,HEADER\n1,That is a test 5\n")
+
+    return_value = generate_text_3434("test", False, s3_settings, project_paths=project_paths, align_columns=True)
+
+    assert return_value is True
+    lines = (path_folder_temporary / "folder_test_3434" / "text_3434.csv").read_text().splitlines()
+    assert lines[0] == "HEADER,PAGE"
+    assert sorted(lines[1:]) == [f"That is a test {line_number}," for line_number in range(5)] + ["That is a test 5,1"]
+
+
+def test_generate_text_with_s3_prints_download_error(
+    prerequisites_generate_text, project_paths: ProjectPaths, s3_settings: S3Settings, capsys: CaptureFixture
+):
+    """Tests if an error of the s3 downloads is printed and the function returns false
+    Requesting prerequisites_generate_text automatically (autouse)
+    """
+    with patch("osc_extraction_utils.merger.S3Communication", Mock(spec=S3Communication)) as mocked_s3:
+        mocked_s3.return_value.iter_download_files_in_prefix_to_dir.side_effect = ConnectionError("unreachable")
+        return_value = generate_text_3434("test", True, s3_settings, project_paths=project_paths)
+
+    assert return_value is False
+    assert "ConnectionError('unreachable')" in capsys.readouterr().out
+
+
 def test_generate_text_successful(
     prerequisites_generate_text, path_folder_temporary: Path, project_paths: ProjectPaths, s3_settings: S3Settings
 ):
@@ -1,5 +1,6 @@
+from io import BytesIO
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 import pytest
 
@@ -7,8 +8,16 @@ from osc_extraction_utils.conftest import (
     create_multiple_xlsx_files,
     create_single_xlsx_file,
 )
-from osc_extraction_utils.merger import Merger
+from osc_extraction_utils.merger import (
+    Merger,
+    _ConcatenatedCsvReader,
+    append_csv_file,
+    merge_csv_files_aligned,
+    merge_csv_files_in_s3,
+    merge_csv_files_incremental,
+)
 from osc_extraction_utils.paths import ProjectPaths
+from osc_extraction_utils.s3_cache import S3ObjectCache
 from osc_extraction_utils.s3_communication import S3Communication
 from osc_extraction_utils.settings import (
     InterimBucketSettings,
@@ -63,9 +72,25 @@ def test_return_s3_communication_main(
         aws_access_key_id=settings["s3_access_key"],
         aws_secret_access_key=settings["s3_secret_key"],
         s3_bucket=settings["s3_bucket_name"],
+        cache=None,
     )
 
 
+def test_return_s3_communication_main_with_cache(merger: Merger, tmp_path: Path):
+    with (
+        patch("osc_extraction_utils.merger.S3Communication") as mocked_s3_communication,
+        patch.object(merger.s3_settings, "cache_enabled", True),
+        patch.object(merger.s3_settings, "cache_max_size_bytes", 1024),
+        patch.object(merger.project_paths, "path_folder_s3_cache", tmp_path / "s3_cache"),
+    ):
+        merger._return_s3_communication_main()
+
+    cache = mocked_s3_communication.call_args.kwargs["cache"]
+    assert isinstance(cache, S3ObjectCache)
+    assert cache.path_folder_cache == tmp_path / "s3_cache"
+    assert cache.max_size_bytes == 1024
+
+
 def test_download_inference_related_files_from_s3(merger: Merger):
     string_path_from_s3: str = str(
         Path(merger.s3_settings.prefix)
@@ -119,3 +144,135 @@ def test_write_output(merger: Merger, path_folder_temporary: Path):
 
     # TODO finish unit test
     # pytest.fail()
+
+
+@pytest.mark.parametrize("buffer_size", [1, 4, 1024])
+def test_append_csv_file(tmp_path: Path, buffer_size: int):
+    path_file_1 = tmp_path / "file_1.csv"
+    path_file_1.write_bytes(b"HEADER\nrow 1\nrow 2")
+    path_file_2 = tmp_path / "file_2.csv"
+    path_file_2.write_bytes(b"HEADER\nrow 3\n")
+    path_file_merged = tmp_path / "merged.csv"
+
+    with open(path_file_merged, "wb") as file_out:
+        append_csv_file(path_file_1, file_out, skip_header=False, buffer_size=buffer_size)
+        append_csv_file(path_file_2, file_out, skip_header=True, buffer_size=buffer_size)
+
+    assert path_file_merged.read_bytes() == b"HEADER\nrow 1\nrow 2\nrow 3\n"
+
+
+def test_merge_csv_files_incremental(tmp_path: Path):
+    paths_csv = []
+    for number in range(3):
+        path_csv = tmp_path / f"file_{number}.csv"
+        path_csv.write_text(f"HEADER\nrow {number}\n")
+        paths_csv.append(str(path_csv))
+    path_file_merged = tmp_path / "merged.csv"
+    path_manifest = tmp_path / ".manifest.json"
+
+    merge_csv_files_incremental(paths_csv[:2], path_file_merged, path_manifest)
+    with patch("osc_extraction_utils.merger.append_csv_file", Mock(wraps=append_csv_file)) as mocked_append:
+        merge_csv_files_incremental(paths_csv, path_file_merged, path_manifest)
+        merge_csv_files_incremental(paths_csv, path_file_merged, path_manifest)
+
+    assert mocked_append.call_count == 1
+    assert mocked_append.call_args.args[0] == paths_csv[2]
+    assert path_file_merged.read_text() == "HEADER\nrow 0\nrow 1\nrow 2\n"
+
+
+@pytest.mark.parametrize("change", ["modified", "removed", "output_modified"])
+def test_merge_csv_files_incremental_rebuild(tmp_path: Path, change: str):
+    paths_csv = []
+    for number in range(3):
+        path_csv = tmp_path / f"file_{number}.csv"
+        path_csv.write_text(f"HEADER\nrow {number}\n")
+        paths_csv.append(str(path_csv))
+    path_file_merged = tmp_path / "merged.csv"
+    path_manifest = tmp_path / ".manifest.json"
+    merge_csv_files_incremental(paths_csv, path_file_merged, path_manifest)
+
+    if change == "modified":
+        Path(paths_csv[1]).write_text("HEADER\nrow 1 changed\n")
+        text_expected = "HEADER\nrow 0\nrow 1 changed\nrow 2\n"
+    elif change == "removed":
+        Path(paths_csv.pop(1)).unlink()
+        text_expected = "HEADER\nrow 0\nrow 2\n"
+    else:
+        path_file_merged.write_text("HEADER\n")
+        text_expected = "HEADER\nrow 0\nrow 1\nrow 2\n"
+    merge_csv_files_incremental(paths_csv, path_file_merged, path_manifest)
+
+    assert path_file_merged.read_text() == text_expected
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 1024])
+def test_merge_csv_files_aligned(tmp_path: Path, chunk_rows: int):
+    contents = [
+        "a,b\n1,x\n2,y\n",
+        "b,a\nz,3\n",
+        "a,c,b\n4,007,\n5,NA,w\n",
+        "",
+        "c\n",
+        "a,b\n6,v",
+    ]
+    paths_csv = []
+    for number, content in enumerate(contents):
+        path_csv = tmp_path / f"file_{number}.csv"
+        path_csv.write_text(content)
+        paths_csv.append(str(path_csv))
+    path_file_merged = tmp_path / "merged.csv"
+
+    count = merge_csv_files_aligned(iter(paths_csv), path_file_merged, chunk_rows=chunk_rows)
+
+    assert count == len(contents)
+    assert path_file_merged.read_text() == "a,b,c\n1,x,\n2,y,\n3,z,\n4,,007\n5,w,NA\n6,v,\n"
+
+
+def test_merge_csv_files_aligned_copies_matching_files(tmp_path: Path):
+    paths_csv = []
+    for number in range(2):
+        path_csv = tmp_path / f"file_{number}.csv"
+        path_csv.write_text(f"a,b\n{number},x\n")
+        paths_csv.append(str(path_csv))
+    path_file_merged = tmp_path / "merged.csv"
+
+    with patch("osc_extraction_utils.merger.append_csv_file", Mock(wraps=append_csv_file)) as mocked_append:
+        merge_csv_files_aligned(paths_csv, path_file_merged)
+
+    assert [call.kwargs["skip_header"] for call in mocked_append.call_args_list] == [False, True]
+    assert path_file_merged.read_text() == "a,b\n0,x\n1,x\n"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_concatenated_csv_reader(chunk_size: int):
+    sources = [BytesIO(b"HEADER\nrow 1\nrow 2"), BytesIO(b"HEADER"), BytesIO(b"HEADER\nrow 3\n")]
+
+    with _ConcatenatedCsvReader(sources, chunk_size=chunk_size) as reader:
+        content = reader.read()
+
+    assert content == b"HEADER\nrow 1\nrow 2\nrow 3\n"
+    assert all(source.closed for source in sources)
+
+
+def test_merge_csv_files_in_s3(capsys: pytest.CaptureFixture):
+    mocked_s3_communication_source = Mock(spec=S3Communication)
+    mocked_s3_communication_source.iter_objects.return_value = iter(
+        [{"Key": "prefix/file_1.csv"}, {"Key": "prefix/file_2.csv"}]
+    )
+    mocked_s3_communication_source.open_file_in_s3.side_effect = lambda prefix, key: BytesIO(
+        f"HEADER\n{prefix}/{key}\n".encode()
+    )
+    mocked_s3_communication_destination = Mock(spec=S3Communication)
+    uploaded: dict = {}
+    mocked_s3_communication_destination.upload_fileobj_to_s3.side_effect = lambda fileobj, prefix, key: uploaded.update(
+        {(prefix, key): fileobj.read()}
+    )
+
+    count = merge_csv_files_in_s3(
+        mocked_s3_communication_source, "prefix", mocked_s3_communication_destination, "prefix_interim", "merged.csv"
+    )
+
+    assert count == 2
+    mocked_s3_communication_source.iter_objects.assert_called_with("prefix", include=("*.csv",))
+    assert uploaded == {("prefix_interim", "merged.csv"): b"HEADER\nprefix/file_1.csv\nprefix/file_2.csv\n"}
+    assert capsys.readouterr().out == "prefix/file_1.csv\nprefix/file_2.csv\n"
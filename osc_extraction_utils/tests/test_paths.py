@@ -58,6 +58,7 @@ def test_check_that_all_required_paths_exist_in_project_path_object(main_setting
         "KPI_EXTRACTION/Text",
         "interim/ml",
         "output/RELEVANCE/Text",
+        "interim/s3_cache",
     ]
 
     with patch.object(ProjectPaths, "_update_all_paths_depending_on_path_project_data_folder"), patch.object(
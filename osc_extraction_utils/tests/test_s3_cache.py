@@ -0,0 +1,90 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from osc_extraction_utils.s3_cache import S3ObjectCache
+
+
+@pytest.fixture
+def s3_object_cache(tmp_path: Path) -> S3ObjectCache:
+    return S3ObjectCache(tmp_path / "cache", max_size_bytes=20)
+
+
+def write_content(content: bytes) -> Mock:
+    return Mock(side_effect=lambda path: path.write_bytes(content))
+
+
+def test_fetch_downloads_only_on_miss(s3_object_cache: S3ObjectCache):
+    download = write_content(b"content")
+
+    path_first = s3_object_cache.fetch('"etag"', download)
+    path_second = s3_object_cache.fetch('"etag"', download)
+
+    download.assert_called_once()
+    assert path_first == path_second
+    assert path_first.read_bytes() == b"content"
+
+
+def test_get_misses_changed_etag(s3_object_cache: S3ObjectCache):
+    s3_object_cache.fetch('"etag"', write_content(b"content"))
+
+    assert s3_object_cache.get('"etag"') is not None
+    assert s3_object_cache.get('"changed_etag"') is None
+
+
+def test_fetch_evicts_least_recently_used(s3_object_cache: S3ObjectCache):
+    for etag in ["first", "second"]:
+        s3_object_cache.fetch(etag, write_content(b"x" * 8))
+    s3_object_cache.get("first")
+
+    s3_object_cache.fetch("third", write_content(b"x" * 8))
+
+    assert s3_object_cache.get("second") is None
+    assert s3_object_cache.get("first") is not None
+    assert s3_object_cache.size_bytes == 16
+
+
+def test_cache_is_indexed_on_restart(s3_object_cache: S3ObjectCache):
+    s3_object_cache.fetch("etag", write_content(b"content"))
+
+    s3_object_cache_restarted = S3ObjectCache(s3_object_cache.path_folder_cache)
+
+    assert s3_object_cache_restarted.get("etag") is not None
+    assert s3_object_cache_restarted.size_bytes == 7
+
+
+def test_failed_download_leaves_no_entry(s3_object_cache: S3ObjectCache):
+    with pytest.raises(ConnectionError):
+        s3_object_cache.fetch("etag", Mock(side_effect=ConnectionError))
+
+    assert s3_object_cache.get("etag") is None
+    assert not any(s3_object_cache.path_folder_cache.iterdir())
+
+
+def test_read_pins_entry_against_eviction(s3_object_cache: S3ObjectCache):
+    def read_entry(path: Path) -> bytes:
+        # another reader fills the cache while this entry is read
+        s3_object_cache.fetch("second", write_content(b"x" * 15))
+        s3_object_cache.fetch("third", write_content(b"x" * 15))
+        return path.read_bytes()
+
+    content = s3_object_cache.read("first", write_content(b"x" * 8), read_entry)
+
+    assert content == b"x" * 8
+    # evicted once it is not read anymore
+    assert s3_object_cache.get("first") is None
+    assert s3_object_cache.size_bytes <= s3_object_cache.max_size_bytes
+
+
+def test_read_downloads_entry_removed_by_other_process(s3_object_cache: S3ObjectCache):
+    path_entry = s3_object_cache.fetch("etag", write_content(b"content"))
+    download = write_content(b"content")
+
+    def read_entry(path: Path) -> bytes:
+        if download.call_count == 0:
+            path_entry.unlink()
+        return path.read_bytes()
+
+    assert s3_object_cache.read("etag", download, read_entry) == b"content"
+    assert download.call_count == 1
@@ -1,14 +1,31 @@
+import hashlib
+import threading
+from datetime import datetime, timezone
+from io import BytesIO
 from pathlib import Path
+from typing import Callable
 from unittest.mock import Mock, patch
 
+import pandas as pd
 import pytest
 
 from osc_extraction_utils.core_utils import (
+    copy_data_from_s3_main_bucket_to_s3_interim_bucket_if_required,
     download_data_from_s3_main_bucket_to_local_folder_if_required,
     upload_data_from_local_folder_to_s3_interim_bucket_if_required,
 )
-from osc_extraction_utils.s3_communication import S3Communication
-from osc_extraction_utils.settings import MainSettings
+from osc_extraction_utils.exceptions import S3DeletionError
+from osc_extraction_utils.s3_cache import S3ObjectCache
+from osc_extraction_utils.s3_compression import S3Codec
+from osc_extraction_utils.s3_communication import (
+    SYNC_MANIFEST_FILENAME,
+    UPLOAD_DIGESTS_FILENAME,
+    S3Communication,
+    S3FileType,
+    _md5_of_file,
+    _prefetch,
+)
+from osc_extraction_utils.settings import MainSettings, S3Settings
 
 # S3Settings = get_s3_settings()
 
@@ -42,6 +59,544 @@ def test_upload_data_from_local_folder_to_s3_interim_bucket_if_required(s3_usage
         )
 
     if s3_usage:
-        mocked_s3_bucket.upload_files_in_dir_to_prefix.assert_called_with(mocked_path_local, mocked_path_s3)
+        mocked_s3_bucket.upload_files_in_dir_to_prefix.assert_called_with(
+            mocked_path_local, mocked_path_s3, max_workers=S3Settings().max_workers, skip_unchanged=True
+        )
     else:
         mocked_s3_bucket.assert_not_called()
+
+
+def mock_object_responses(mocked_client: Mock, content: Callable[[str], bytes], metadata: dict | None = None) -> None:
+    def head_object(Bucket, Key, **kwargs):
+        return {"ContentLength": len(content(Key)), "ETag": '"etag"', "Metadata": metadata or {}}
+
+    def get_object(Bucket, Key, **kwargs):
+        return {**head_object(Bucket, Key), "Body": BytesIO(content(Key))}
+
+    mocked_client.head_object.side_effect = head_object
+    mocked_client.get_object.side_effect = get_object
+
+
+@pytest.fixture
+def s3_communication() -> S3Communication:
+    s3_communication_ = S3Communication("https://0.0.0.0", "access_key", "secret_key", "bucket")
+    s3_communication_.s3_client = Mock()
+    return s3_communication_
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_download_files_in_prefix_to_dir(s3_communication: S3Communication, tmp_path: Path, max_workers):
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "prefix/sub/", "Size": 0}]},
+        {"Contents": [{"Key": f"prefix/sub/file_{i}.csv", "Size": 21} for i in range(5)]},
+    ]
+    mock_object_responses(mocked_client, lambda key: key.encode())
+
+    summary = s3_communication.download_files_in_prefix_to_dir("prefix", tmp_path, max_workers)
+
+    mocked_client.get_paginator.assert_called_once_with("list_objects_v2")
+    assert "Delimiter" not in mocked_client.get_paginator.return_value.paginate.call_args.kwargs
+    assert summary.object_count == 5
+    assert summary.bytes_transferred == 105
+    mocked_client.head_object.assert_not_called()
+    for i in range(5):
+        assert (tmp_path / f"file_{i}.csv").read_text() == f"prefix/sub/file_{i}.csv"
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_upload_files_in_dir_to_prefix(s3_communication: S3Communication, tmp_path: Path, max_workers):
+    (tmp_path / "subfolder").mkdir()
+    (tmp_path / ".hidden").write_text("hidden")
+    for i in range(3):
+        (tmp_path / f"file_{i}.json").write_text("content")
+    (tmp_path / "subfolder" / "file_3.json").write_text("content")
+    mocked_client = s3_communication.s3_client
+    uploaded: dict = {}
+    mocked_client.upload_file.side_effect = lambda path, bucket, key, **kwargs: uploaded.update(
+        {key: Path(path).read_bytes()}
+    )
+
+    summary = s3_communication.upload_files_in_dir_to_prefix(tmp_path, "prefix", max_workers)
+
+    assert uploaded == {f"prefix/file_{i}.json": b"content" for i in range(4)}
+    assert summary.object_count == 4
+    assert summary.bytes_transferred == 28
+    assert sorted(result.key for result in summary.results) == sorted(uploaded)
+
+
+def test_download_file_from_s3_keeps_no_partial_file(s3_communication: S3Communication, tmp_path: Path):
+    class FailingBody(BytesIO):
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise ConnectionError
+            return super().read(size)
+
+    s3_communication.s3_client.head_object.return_value = {"ContentLength": 100, "Metadata": {}}
+    s3_communication.s3_client.get_object.return_value = {"Body": FailingBody(b"partial"), "ContentLength": 100}
+
+    with pytest.raises(ConnectionError):
+        s3_communication.download_file_from_s3(tmp_path / "file.pdf", "prefix", "file.pdf")
+
+    assert not any(tmp_path.iterdir())
+
+
+def test_download_file_from_s3_large_object_uses_ranged_requests(s3_communication: S3Communication, tmp_path: Path):
+    mocked_client = s3_communication.s3_client
+    mocked_client.head_object.return_value = {
+        "ContentLength": s3_communication.transfer_config.multipart_threshold + 1,
+        "Metadata": {},
+    }
+    mocked_client.download_file.side_effect = lambda bucket, key, filename, **kwargs: Path(filename).write_bytes(
+        b"content"
+    )
+
+    s3_communication.download_file_from_s3(tmp_path / "file.pdf", "prefix", "file.pdf")
+
+    mocked_client.get_object.assert_not_called()
+    assert (tmp_path / "file.pdf").read_bytes() == b"content"
+
+
+@pytest.mark.parametrize("multipart_threshold", [5 * 1024**2, 64 * 1024**2])
+def test_upload_df_to_s3_streams_buffer(multipart_threshold: int):
+    s3_communication = S3Communication(
+        "https://0.0.0.0", "access_key", "secret_key", "bucket", multipart_threshold=multipart_threshold
+    )
+    s3_communication.s3_client = Mock()
+    uploaded: dict = {}
+    s3_communication.s3_client.upload_fileobj.side_effect = lambda fileobj, bucket, key, ExtraArgs, Config: (
+        uploaded.update({key: fileobj.read()})
+    )
+
+    s3_communication.upload_df_to_s3(
+        pd.DataFrame({"a": [1, 2]}), "prefix", "file.csv", filetype=S3FileType.CSV, index=False
+    )
+
+    assert uploaded == {"prefix/file.csv": b"a\n1\n2\n"}
+    _, kwargs = s3_communication.s3_client.upload_fileobj.call_args
+    assert kwargs["Config"].multipart_threshold == multipart_threshold
+
+
+def test_download_files_in_prefix_to_dir_skip_unchanged(s3_communication: S3Communication, tmp_path: Path):
+    mocked_client = s3_communication.s3_client
+    listing = [
+        {"Key": f"prefix/file_{i}.csv", "Size": 11, "ETag": f'"{i}"', "LastModified": datetime(2024, 1, 1)}
+        for i in range(3)
+    ]
+    mocked_client.get_paginator.return_value.paginate.return_value = [{"Contents": listing}]
+    mock_object_responses(mocked_client, lambda key: key[-11:].encode())
+
+    summary_first = s3_communication.download_files_in_prefix_to_dir("prefix", tmp_path, skip_unchanged=True)
+    listing[1]["ETag"] = '"changed"'
+    (tmp_path / "file_2.csv").unlink()
+    summary_second = s3_communication.download_files_in_prefix_to_dir("prefix", tmp_path, skip_unchanged=True)
+
+    assert summary_first.object_count == 3
+    assert sorted(result.key for result in summary_second.results) == ["prefix/file_1.csv", "prefix/file_2.csv"]
+    assert summary_second.skipped == ["prefix/file_0.csv"]
+    assert (tmp_path / SYNC_MANIFEST_FILENAME).exists()
+
+
+def test_upload_files_in_dir_to_prefix_skip_unchanged(s3_communication: S3Communication, tmp_path: Path):
+    for name in ["unchanged.json", "changed.json", "new.json", "multipart.json"]:
+        (tmp_path / name).write_text("content")
+    md5_content = hashlib.md5(b"content").hexdigest()
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {
+            "Contents": [
+                {"Key": "prefix/unchanged.json", "Size": 7, "ETag": f'"{md5_content}"'},
+                {"Key": "prefix/changed.json", "Size": 7, "ETag": '"0123"'},
+                {"Key": "prefix/multipart.json", "Size": 7, "ETag": '"0123-2"'},
+            ]
+        }
+    ]
+    mocked_client.head_object.return_value = {"Metadata": {"md5": md5_content}}
+
+    summary = s3_communication.upload_files_in_dir_to_prefix(tmp_path, "prefix", skip_unchanged=True)
+
+    assert sorted(summary.skipped) == ["prefix/multipart.json", "prefix/unchanged.json"]
+    assert sorted(result.key for result in summary.results) == ["prefix/changed.json", "prefix/new.json"]
+    for call in mocked_client.upload_file.call_args_list:
+        assert call.kwargs["ExtraArgs"] == {"Metadata": {"md5": md5_content}}
+
+
+def test_upload_files_in_dir_to_prefix_skip_unchanged_hashes_modified_files(
+    s3_communication: S3Communication, tmp_path: Path
+):
+    for name in ["file_1.json", "file_2.json"]:
+        (tmp_path / name).write_text("content")
+    s3_communication.s3_client.get_paginator.return_value.paginate.return_value = []
+
+    with patch("osc_extraction_utils.s3_communication._md5_of_file", Mock(wraps=_md5_of_file)) as mocked_md5:
+        s3_communication.upload_files_in_dir_to_prefix(tmp_path, "prefix", skip_unchanged=True)
+        (tmp_path / "file_2.json").write_text("modified")
+        s3_communication.upload_files_in_dir_to_prefix(tmp_path, "prefix", skip_unchanged=True)
+
+    assert sorted(Path(call.args[0]).name for call in mocked_md5.call_args_list) == [
+        "file_1.json",
+        "file_2.json",
+        "file_2.json",
+    ]
+    assert (tmp_path / UPLOAD_DIGESTS_FILENAME).exists()
+
+
+def test_s3_communication_shares_clients():
+    s3_communication_main = S3Communication("https://0.0.0.0", "access_key", "secret_key", "bucket_main")
+    s3_communication_interim = S3Communication("https://0.0.0.0", "access_key", "secret_key", "bucket_interim")
+    s3_communication_other = S3Communication("https://0.0.0.0", "other_access_key", "secret_key", "bucket_main")
+
+    assert s3_communication_main.s3_client is s3_communication_interim.s3_client
+    assert s3_communication_main.s3_client is not s3_communication_other.s3_client
+    assert s3_communication_main.s3_client.meta.config.max_pool_connections == 50
+
+
+def test_s3_resource_uses_shared_client():
+    s3_communication = S3Communication("https://0.0.0.0", "access_key", "secret_key", "bucket")
+
+    assert s3_communication.s3_resource.meta.client is s3_communication.s3_client
+    assert s3_communication.s3_resource.Bucket("bucket").meta.client is s3_communication.s3_client
+    assert s3_communication.s3_resource is s3_communication.s3_resource
+
+
+def test_download_df_from_s3_with_cache(s3_communication: S3Communication, tmp_path: Path):
+    s3_communication.cache = S3ObjectCache(tmp_path)
+    mocked_client = s3_communication.s3_client
+    mock_object_responses(mocked_client, lambda key: b"a,b\n1,2\n")
+
+    for _ in range(2):
+        df = s3_communication.download_df_from_s3("prefix", "file.csv", filetype=S3FileType.CSV)
+        assert df.to_dict("list") == {"a": [1], "b": [2]}
+
+    mocked_client.get_object.assert_called_once_with(Bucket="bucket", Key="prefix/file.csv", IfMatch='"etag"')
+    mocked_client.download_fileobj.assert_not_called()
+
+
+def test_download_df_from_s3_parquet_projection(s3_communication: S3Communication):
+    df = pd.DataFrame({"company": ["a"] * 10 + ["b"] * 10, "value": range(20), "text": ["text"] * 20})
+    buffer = BytesIO()
+    df.to_parquet(buffer, row_group_size=10)
+    data = buffer.getvalue()
+
+    def get_object(Bucket, Key, Range, IfMatch):
+        start, end = map(int, Range.removeprefix("bytes=").split("-"))
+        return {"Body": BytesIO(data[start : end + 1])}
+
+    mocked_client = s3_communication.s3_client
+    mocked_client.head_object.return_value = {"ContentLength": len(data), "ETag": '"etag"'}
+    mocked_client.get_object.side_effect = get_object
+
+    df_projected = s3_communication.download_df_from_s3(
+        "prefix", "file.parquet", columns=["company", "value"], filters=[("company", "=", "b")]
+    )
+
+    assert df_projected.to_dict("list") == {"company": ["b"] * 10, "value": list(range(10, 20))}
+    mocked_client.download_fileobj.assert_not_called()
+    assert all(call.kwargs["IfMatch"] == '"etag"' for call in mocked_client.get_object.call_args_list)
+
+
+def test_iter_df_chunks_from_s3(s3_communication: S3Communication):
+    s3_communication.s3_client.get_object.return_value = {
+        "Body": BytesIO(("a,b\n" + "".join(f"{i},{i}\n" for i in range(25))).encode())
+    }
+
+    chunks = list(s3_communication.iter_df_chunks_from_s3("prefix", "file.csv", chunksize=10, usecols=["a"]))
+
+    assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+    assert pd.concat(chunks)["a"].tolist() == list(range(25))
+    s3_communication.s3_client.get_object.assert_called_once_with(Bucket="bucket", Key="prefix/file.csv")
+    s3_communication.s3_client.download_fileobj.assert_not_called()
+
+
+@pytest.mark.parametrize("codec", [S3Codec.GZIP, S3Codec.ZSTD])
+def test_upload_and_download_compressed_df(s3_communication: S3Communication, codec: S3Codec):
+    if codec == S3Codec.ZSTD:
+        pytest.importorskip("zstandard")
+    df = pd.DataFrame({"text": ["compressible text"] * 1000})
+    uploaded: dict = {}
+    s3_communication.s3_client.upload_fileobj.side_effect = lambda fileobj, bucket, key, ExtraArgs, Config: (
+        uploaded.update({key: (fileobj.read(), ExtraArgs["Metadata"])})
+    )
+
+    s3_communication.upload_df_to_s3(df, "prefix", "file.csv", filetype=S3FileType.CSV, codec=codec, index=False)
+    data, metadata = uploaded["prefix/file.csv"]
+    mock_object_responses(s3_communication.s3_client, lambda key: data, metadata)
+    df_downloaded = s3_communication.download_df_from_s3("prefix", "file.csv", filetype=S3FileType.CSV)
+
+    assert metadata == {"codec": codec.value}
+    assert len(data) < len(df.to_csv(index=False)) / 10
+    assert df_downloaded.equals(df)
+
+
+def test_upload_df_to_s3_compressed_parquet(s3_communication: S3Communication):
+    with pytest.raises(ValueError):
+        s3_communication.upload_df_to_s3(pd.DataFrame({"a": [1]}), "prefix", "file.parquet", codec=S3Codec.GZIP)
+
+
+def test_delete_files_in_prefix_batches(s3_communication: S3Communication):
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": f"prefix/file_{i}", "Size": 1} for i in range(page, min(page + 1000, 2500))]}
+        for page in range(0, 2500, 1000)
+    ] + [{"Contents": [{"Key": "prefix/", "Size": 0}]}]
+    mocked_client.delete_objects.return_value = {}
+
+    summary = s3_communication.delete_files_in_prefix("prefix", max_workers=2)
+
+    batch_sizes = sorted(len(call.kwargs["Delete"]["Objects"]) for call in mocked_client.delete_objects.call_args_list)
+    assert batch_sizes == [501, 1000, 1000]
+    assert mocked_client.get_paginator.return_value.paginate.call_args.kwargs["Prefix"] == "prefix/"
+    assert summary.object_count == 2501
+    assert summary.bytes_deleted == 2500
+
+
+def test_delete_files_in_prefix_errors(s3_communication: S3Communication):
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "prefix/file_1"}, {"Key": "prefix/file_2"}]}
+    ]
+    mocked_client.delete_objects.return_value = {
+        "Errors": [{"Key": "prefix/file_2", "Code": "AccessDenied", "Message": "Access Denied"}]
+    }
+
+    with pytest.raises(S3DeletionError, match="prefix/file_2"):
+        s3_communication.delete_files_in_prefix("prefix")
+
+
+def test_delete_files_in_prefix_empty_prefix(s3_communication: S3Communication):
+    with pytest.raises(ValueError):
+        s3_communication.delete_files_in_prefix("/")
+    s3_communication.s3_client.delete_objects.assert_not_called()
+
+
+@pytest.mark.parametrize("s3_usage", [True, False])
+def test_copy_data_from_s3_main_bucket_to_s3_interim_bucket_if_required(s3_usage: bool, main_settings: MainSettings):
+    mocked_s3_bucket_main = Mock(spec=S3Communication)
+    mocked_s3_bucket_interim = Mock(spec=S3Communication)
+
+    with patch.object(main_settings.general, "s3_usage", s3_usage):
+        copy_data_from_s3_main_bucket_to_s3_interim_bucket_if_required(
+            mocked_s3_bucket_main, Path("path_main"), mocked_s3_bucket_interim, Path("path_interim"), main_settings
+        )
+
+    if s3_usage:
+        mocked_s3_bucket_main.copy_files_in_prefix_to_s3.assert_called_with(
+            "path_main", mocked_s3_bucket_interim, "path_interim", max_workers=1
+        )
+    else:
+        mocked_s3_bucket_main.copy_files_in_prefix_to_s3.assert_not_called()
+
+
+@pytest.fixture
+def s3_communication_destination() -> S3Communication:
+    s3_communication_destination = S3Communication(
+        s3_endpoint_url="https://s3.amazonaws.com",
+        aws_access_key_id="key_access",
+        aws_secret_access_key="key_secret",
+        s3_bucket="bucket_interim",
+    )
+    s3_communication_destination.s3_client = Mock()
+    return s3_communication_destination
+
+
+def test_copy_files_in_prefix_to_s3_server_side(
+    s3_communication: S3Communication, s3_communication_destination: S3Communication
+):
+    s3_communication.s3_client.meta.endpoint_url = "https://s3.amazonaws.com"
+    s3_communication_destination.s3_client.meta.endpoint_url = "https://s3.amazonaws.com"
+    s3_communication.s3_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "prefix/file_1.csv", "Size": 3}, {"Key": "prefix/sub/file_2.csv", "Size": 4}]}
+    ]
+
+    summary = s3_communication.copy_files_in_prefix_to_s3(
+        "prefix", s3_communication_destination, "prefix_interim", max_workers=2
+    )
+
+    copies = sorted(s3_communication_destination.s3_client.copy.call_args_list, key=lambda call: call.args[0]["Key"])
+    assert [call.args for call in copies] == [
+        (
+            {"Bucket": s3_communication.bucket, "Key": "prefix/file_1.csv"},
+            "bucket_interim",
+            "prefix_interim/file_1.csv",
+        ),
+        (
+            {"Bucket": s3_communication.bucket, "Key": "prefix/sub/file_2.csv"},
+            "bucket_interim",
+            "prefix_interim/sub/file_2.csv",
+        ),
+    ]
+    assert all(call.kwargs["SourceClient"] is s3_communication.s3_client for call in copies)
+    s3_communication.s3_client.get_object.assert_not_called()
+    assert summary.object_count == 2
+    assert summary.bytes_transferred == 7
+
+
+def test_copy_file_to_s3_streams_between_endpoints(
+    s3_communication: S3Communication, s3_communication_destination: S3Communication
+):
+    s3_communication.s3_client.meta.endpoint_url = "https://s3.main.example.com"
+    s3_communication_destination.s3_client.meta.endpoint_url = "https://s3.interim.example.com"
+    mock_object_responses(s3_communication.s3_client, lambda key: b"content", {"md5": "abc"})
+    uploaded: dict = {}
+    s3_communication_destination.s3_client.upload_fileobj.side_effect = (
+        lambda fileobj, bucket, key, ExtraArgs, Config: uploaded.update({(bucket, key): (fileobj.read(), ExtraArgs)})
+    )
+
+    s3_communication.copy_file_to_s3("prefix", "file.csv", s3_communication_destination, "prefix_interim", "file.csv")
+
+    s3_communication_destination.s3_client.copy.assert_not_called()
+    assert uploaded == {("bucket_interim", "prefix_interim/file.csv"): (b"content", {"Metadata": {"md5": "abc"}})}
+
+
+def test_md5_of_file(tmp_path: Path):
+    content = bytes(range(256)) * 10000
+    path_file = tmp_path / "file.bin"
+    path_file.write_bytes(content)
+
+    md5 = _md5_of_file(path_file, chunk_size=5000)
+
+    assert md5 == hashlib.md5(content).hexdigest()
+
+
+def test_iter_objects_filters(s3_communication: S3Communication):
+    s3_communication.s3_client.get_paginator.return_value.paginate.return_value = [
+        {
+            "Contents": [
+                {"Key": "prefix/", "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+                {"Key": "prefix/old.csv", "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+                {"Key": "prefix/new.csv", "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+                {"Key": "prefix/new.json", "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+            ]
+        }
+    ]
+
+    keys = [file["Key"] for file in s3_communication.iter_objects("prefix/")]
+    keys_filtered = [
+        file["Key"]
+        for file in s3_communication.iter_objects("prefix/", suffix=".csv", modified_since=datetime(2024, 1, 2))
+    ]
+
+    assert keys == ["prefix/old.csv", "prefix/new.csv", "prefix/new.json"]
+    assert keys_filtered == ["prefix/new.csv"]
+    s3_communication.s3_client.get_object.assert_not_called()
+
+
+def test_prefetch_requests_next_page_in_background():
+    second_page_requested = threading.Event()
+
+    def pages():
+        yield 1
+        second_page_requested.set()
+        yield 2
+        raise ConnectionError
+
+    iterator = _prefetch(pages())
+
+    assert next(iterator) == 1
+    assert second_page_requested.wait(timeout=5)
+    assert next(iterator) == 2
+    with pytest.raises(ConnectionError):
+        next(iterator)
+
+
+def test_download_files_in_prefix_to_dir_filters(s3_communication: S3Communication, tmp_path: Path):
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {
+            "Contents": [
+                {"Key": "prefix/new.csv", "Size": 14, "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+                {"Key": "prefix/old.csv", "Size": 14, "LastModified": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+                {"Key": "prefix/new.json", "Size": 15, "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+                {"Key": "prefix/tmp_new.csv", "Size": 18, "LastModified": datetime(2024, 1, 3, tzinfo=timezone.utc)},
+            ]
+        }
+    ]
+    mock_object_responses(mocked_client, lambda key: key.encode())
+
+    summary = s3_communication.download_files_in_prefix_to_dir(
+        "prefix",
+        tmp_path,
+        include=["*.csv"],
+        exclude=["tmp_*"],
+        modified_since=datetime(2024, 1, 2, tzinfo=timezone.utc),
+    )
+
+    assert [result.key for result in summary.results] == ["prefix/new.csv"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new.csv"]
+
+
+def test_download_files_in_prefix_to_dir_resumes_from_journal(s3_communication: S3Communication, tmp_path: Path):
+    mocked_client = s3_communication.s3_client
+    listing = [
+        {"Key": "prefix/file_1.csv", "Size": 17, "ETag": '"etag_1"'},
+        {"Key": "prefix/file_2.csv", "Size": 17, "ETag": '"etag_2"'},
+    ]
+    mocked_client.get_paginator.return_value.paginate.return_value = [{"Contents": listing}]
+    mocked_client.head_object.return_value = {"ContentLength": 17, "Metadata": {}}
+    mocked_client.get_object.side_effect = [
+        {"Body": BytesIO(b"prefix/file_1.csv"), "ContentLength": 17},
+        ConnectionError,
+        {"Body": BytesIO(b"prefix/file_2.csv"), "ContentLength": 17},
+    ]
+    path_journal = tmp_path / "journal.jsonl"
+
+    with pytest.raises(ConnectionError):
+        s3_communication.download_files_in_prefix_to_dir("prefix", tmp_path / "local", journal_path=path_journal)
+    summary = s3_communication.download_files_in_prefix_to_dir("prefix", tmp_path / "local", journal_path=path_journal)
+
+    assert summary.skipped == ["prefix/file_1.csv"]
+    assert [result.key for result in summary.results] == ["prefix/file_2.csv"]
+    assert (tmp_path / "local" / "file_2.csv").read_text() == "prefix/file_2.csv"
+
+
+def test_upload_files_in_dir_to_prefix_resumes_from_journal(s3_communication: S3Communication, tmp_path: Path):
+    path_folder_source = tmp_path / "source"
+    path_folder_source.mkdir()
+    for name in ["file_1.csv", "file_2.csv"]:
+        (path_folder_source / name).write_text(name)
+    path_journal = tmp_path / "journal.jsonl"
+    mocked_client = s3_communication.s3_client
+    mocked_client.upload_file.side_effect = [None, ConnectionError, None, None, None]
+
+    with pytest.raises(ConnectionError):
+        s3_communication.upload_files_in_dir_to_prefix(path_folder_source, "prefix", journal_path=path_journal)
+    summary = s3_communication.upload_files_in_dir_to_prefix(path_folder_source, "prefix", journal_path=path_journal)
+
+    assert len(summary.skipped) == 1
+    assert summary.object_count == 1
+    assert mocked_client.upload_file.call_count == 3
+    assert mocked_client.upload_file.call_args.kwargs["ExtraArgs"] == {
+        "Metadata": {"md5": hashlib.md5(Path(summary.results[0].path).read_bytes()).hexdigest()}
+    }
+    assert not path_journal.exists()
+
+    # the journal of a completed upload does not skip files once the prefix is gone
+    summary = s3_communication.upload_files_in_dir_to_prefix(path_folder_source, "prefix", journal_path=path_journal)
+    assert summary.object_count == 2
+
+
+def test_iter_download_files_in_prefix_to_dir_yields_while_downloading(
+    s3_communication: S3Communication, tmp_path: Path
+):
+    mocked_client = s3_communication.s3_client
+    mocked_client.get_paginator.return_value.paginate.return_value = [
+        {"Contents": [{"Key": "prefix/file_1.csv", "Size": 1}, {"Key": "prefix/file_2.csv", "Size": 1}]}
+    ]
+    first_file_consumed = threading.Event()
+
+    def get_object(Bucket, Key, **kwargs):
+        # the second download only finishes once the first file was handed to the caller
+        if Key == "prefix/file_2.csv":
+            assert first_file_consumed.wait(timeout=5)
+        return {"Body": BytesIO(b"x"), "ContentLength": 1}
+
+    mocked_client.head_object.return_value = {"ContentLength": 1, "Metadata": {}}
+    mocked_client.get_object.side_effect = get_object
+
+    results = s3_communication.iter_download_files_in_prefix_to_dir("prefix", tmp_path, max_workers=2)
+    result_first = next(results)
+    first_file_consumed.set()
+    result_second = next(results)
+
+    assert (result_first.key, result_second.key) == ("prefix/file_1.csv", "prefix/file_2.csv")
+    assert list(results) == []
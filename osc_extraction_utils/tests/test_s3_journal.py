@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from osc_extraction_utils.s3_journal import TransferJournal
+
+
+def test_record_and_reopen(tmp_path: Path):
+    path_journal = tmp_path / "journal" / "transfer.jsonl"
+    journal = TransferJournal(path_journal)
+
+    journal.record("prefix/file_1.csv", size=1, etag='"a"')
+    journal.record("prefix/file_2.csv", size=2, etag='"b"')
+    journal.record("prefix/file_1.csv", size=3, etag='"c"')
+
+    journal_reopened = TransferJournal(path_journal)
+    assert journal_reopened.get("prefix/file_1.csv") == {"key": "prefix/file_1.csv", "size": 3, "etag": '"c"'}
+    assert journal_reopened.get("prefix/file_2.csv") == {"key": "prefix/file_2.csv", "size": 2, "etag": '"b"'}
+    assert journal_reopened.get("prefix/file_3.csv") is None
+
+
+def test_truncated_line_is_ignored(tmp_path: Path):
+    path_journal = tmp_path / "transfer.jsonl"
+    path_journal.write_text('{"key": "prefix/file_1.csv", "size": 1}\n{"key": "prefix/fi')
+
+    journal = TransferJournal(path_journal)
+    journal.record("prefix/file_2.csv", size=2)
+
+    assert journal.get("prefix/file_1.csv") == {"key": "prefix/file_1.csv", "size": 1}
+    assert TransferJournal(path_journal).get("prefix/file_2.csv") == {"key": "prefix/file_2.csv", "size": 2}
+
+
+def test_clear(tmp_path: Path):
+    path_journal = tmp_path / "transfer.jsonl"
+    journal = TransferJournal(path_journal)
+    journal.record("prefix/file_1.csv", size=1)
+
+    journal.clear()
+
+    assert not path_journal.exists()
+    assert journal.get("prefix/file_1.csv") is None
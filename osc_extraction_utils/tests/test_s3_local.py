@@ -0,0 +1,164 @@
+import hashlib
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+
+from osc_extraction_utils.s3_communication import (
+    S3Codec,
+    S3Communication,
+    S3FileType,
+    get_s3_client,
+)
+from osc_extraction_utils.s3_local import LocalS3Client
+
+
+@pytest.fixture
+def s3_communication_local(tmp_path: Path) -> S3Communication:
+    return S3Communication(
+        s3_endpoint_url=f"file://{tmp_path / 'store'}",
+        aws_access_key_id=None,
+        aws_secret_access_key=None,
+        s3_bucket="bucket",
+    )
+
+
+def test_get_s3_client_local(tmp_path: Path):
+    s3_client = get_s3_client(f"file://{tmp_path}", None, None)
+
+    assert isinstance(s3_client, LocalS3Client)
+    assert s3_client.path_folder_root == tmp_path
+    assert get_s3_client(f"file://{tmp_path}", None, None) is s3_client
+
+
+def test_upload_and_download_file(s3_communication_local: S3Communication, tmp_path: Path):
+    path_file = tmp_path / "file.txt"
+    path_file.write_text("content")
+
+    s3_communication_local.upload_file_to_s3(path_file, "prefix", "file.txt", metadata={"md5": "abc"})
+    s3_communication_local.download_file_from_s3(tmp_path / "file_downloaded.txt", "prefix", "file.txt")
+    head = s3_communication_local.s3_client.head_object(Bucket="bucket", Key="prefix/file.txt")
+
+    assert (tmp_path / "store" / "bucket" / "prefix" / "file.txt").read_text() == "content"
+    assert (tmp_path / "file_downloaded.txt").read_text() == "content"
+    assert head["ETag"] == '"9a0364b9e99bb480dd25e1f0284c8555"'
+    assert head["Metadata"] == {"md5": "abc"}
+
+
+def test_upload_and_download_df(s3_communication_local: S3Communication):
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+
+    s3_communication_local.upload_df_to_s3(df, "prefix", "file.parquet")
+    df_downloaded = s3_communication_local.download_df_from_s3("prefix", "file.parquet", columns=["b"])
+
+    assert df_downloaded.equals(df[["b"]])
+
+
+def test_files_in_prefix(s3_communication_local: S3Communication, tmp_path: Path):
+    s3_client = s3_communication_local.s3_client
+    for key in ["prefix/file_1.csv", "prefix/sub/file_2.csv", "prefix_other/file_3.csv"]:
+        s3_client.put_object(Bucket="bucket", Key=key, Body=key.encode())
+
+    pages = list(
+        s3_client.get_paginator("list_objects_v2").paginate(
+            Bucket="bucket", Prefix="prefix/", PaginationConfig={"PageSize": 1}
+        )
+    )
+    summary_download = s3_communication_local.download_files_in_prefix_to_dir("prefix/", tmp_path / "local")
+    summary_delete = s3_communication_local.delete_files_in_prefix("prefix")
+
+    assert [[file["Key"] for file in page["Contents"]] for page in pages] == [
+        ["prefix/file_1.csv"],
+        ["prefix/sub/file_2.csv"],
+    ]
+    assert summary_download.object_count == 2
+    assert (tmp_path / "local" / "file_2.csv").read_text() == "prefix/sub/file_2.csv"
+    assert summary_delete.object_count == 2
+    assert [file["Key"] for file in s3_communication_local._iter_files_in_prefix("")] == ["prefix_other/file_3.csv"]
+
+
+@pytest.mark.parametrize("resume_from", ["manifest", "journal"])
+def test_download_files_in_prefix_to_dir_skips_unchanged_compressed(
+    s3_communication_local: S3Communication, tmp_path: Path, resume_from: str
+):
+    df = pd.DataFrame({"a": range(1000)})
+    s3_communication_local.upload_df_to_s3(df, "prefix", "compressed.csv", S3FileType.CSV, codec=S3Codec.GZIP)
+    s3_communication_local.upload_df_to_s3(df, "prefix", "plain.csv", S3FileType.CSV)
+    kwargs: dict = (
+        {"skip_unchanged": True} if resume_from == "manifest" else {"journal_path": tmp_path / "journal.jsonl"}
+    )
+
+    summary_first = s3_communication_local.download_files_in_prefix_to_dir("prefix/", tmp_path / "local", **kwargs)
+    summary_second = s3_communication_local.download_files_in_prefix_to_dir("prefix/", tmp_path / "local", **kwargs)
+
+    assert [result.size for result in summary_first.results] == [
+        os.path.getsize(tmp_path / "local" / name) for name in ["compressed.csv", "plain.csv"]
+    ]
+    assert summary_second.object_count == 0
+    assert sorted(summary_second.skipped) == ["prefix/compressed.csv", "prefix/plain.csv"]
+
+
+def test_copy_files_in_prefix_to_s3_hardlinks(s3_communication_local: S3Communication, tmp_path: Path):
+    s3_communication_destination = S3Communication(f"file://{tmp_path / 'store'}", None, None, "bucket_interim")
+    s3_communication_local.s3_client.put_object(Bucket="bucket", Key="prefix/file.csv", Body=b"a,b\n")
+
+    s3_communication_local.copy_files_in_prefix_to_s3("prefix", s3_communication_destination, "prefix_interim")
+
+    path_source = tmp_path / "store" / "bucket" / "prefix" / "file.csv"
+    path_destination = tmp_path / "store" / "bucket_interim" / "prefix_interim" / "file.csv"
+    assert os.path.samefile(path_source, path_destination)
+
+
+def test_get_object_errors(s3_communication_local: S3Communication):
+    s3_client = s3_communication_local.s3_client
+    s3_client.put_object(Bucket="bucket", Key="file.csv", Body=b"a,b\n")
+
+    with pytest.raises(ClientError) as exception_missing:
+        s3_client.get_object(Bucket="bucket", Key="missing.csv")
+    with pytest.raises(ClientError) as exception_changed:
+        s3_client.get_object(Bucket="bucket", Key="file.csv", IfMatch='"outdated"')
+
+    assert exception_missing.value.response["Error"]["Code"] == "404"
+    assert exception_changed.value.response["Error"]["Code"] == "PreconditionFailed"
+    assert s3_client.get_object(Bucket="bucket", Key="file.csv", Range="bytes=2-")["Body"].read() == b"b\n"
+
+
+def test_object_written_without_client(s3_communication_local: S3Communication, tmp_path: Path):
+    s3_communication_local.s3_client.put_object(Bucket="bucket", Key="file.csv", Body=b"a", Metadata={"md5": "x"})
+    (tmp_path / "store" / "bucket" / "file.csv").write_bytes(b"changed")
+
+    head = s3_communication_local.s3_client.head_object(Bucket="bucket", Key="file.csv")
+
+    assert head["ContentLength"] == 7
+    assert head["Metadata"] == {}
+
+
+def test_object_written_without_client_is_hashed_once(s3_communication_local: S3Communication, tmp_path: Path):
+    (tmp_path / "store" / "bucket" / "prefix").mkdir(parents=True)
+    (tmp_path / "store" / "bucket" / "prefix" / "file.csv").write_bytes(b"content")
+
+    with patch.object(LocalS3Client, "_md5_of_file", side_effect=LocalS3Client._md5_of_file) as mocked_md5:
+        for _ in range(3):
+            files = list(s3_communication_local.iter_objects("prefix/"))
+
+    assert mocked_md5.call_count == 1
+    assert files[0]["ETag"] == f'"{hashlib.md5(b"content").hexdigest()}"'
+
+
+def test_download_file_uses_file_copy(s3_communication_local: S3Communication, tmp_path: Path):
+    path_file = tmp_path / "file.txt"
+    path_file.write_text("content")
+    s3_communication_local.upload_file_to_s3(path_file, "prefix", "file.txt")
+
+    with (
+        patch.object(LocalS3Client, "download_file", autospec=True, side_effect=LocalS3Client.download_file) as mocked,
+        patch.object(LocalS3Client, "get_object") as mocked_get_object,
+    ):
+        s3_communication_local.download_files_in_prefix_to_dir("prefix/", tmp_path / "local")
+
+    assert mocked.call_count == 1
+    mocked_get_object.assert_not_called()
+    assert (tmp_path / "local" / "file.txt").read_text() == "content"
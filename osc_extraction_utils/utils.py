@@ -35,13 +35,22 @@ def save_train_info(
         # s3_settings = project_settings["s3_settings"]
         project_prefix = s3_settings.prefix + "/" + project_name + "/data"
         s3c_main.download_files_in_prefix_to_dir(
-            project_prefix + "/input/kpi_mapping", str(project_paths.path_folder_source_mapping)
+            project_prefix + "/input/kpi_mapping",
+            str(project_paths.path_folder_source_mapping),
+            max_workers=s3_settings.max_workers,
+            skip_unchanged=True,
         )
         s3c_main.download_files_in_prefix_to_dir(
-            project_prefix + "/input/annotations", str(project_paths.path_folder_source_annotation)
+            project_prefix + "/input/annotations",
+            str(project_paths.path_folder_source_annotation),
+            max_workers=s3_settings.max_workers,
+            skip_unchanged=True,
         )
         s3c_main.download_files_in_prefix_to_dir(
-            project_prefix + "/input/pdfs/training", str(project_paths.path_folder_source_pdf)
+            project_prefix + "/input/pdfs/training",
+            str(project_paths.path_folder_source_pdf),
+            max_workers=s3_settings.max_workers,
+            skip_unchanged=True,
         )
 
     dir_train: dict[str, Any] = {}
@@ -49,7 +58,9 @@ def save_train_info(
     # dir_train.update({'train_settings': project_settings})
     dir_train.update({"train_settings": main_settings})
     # dir_train.update({'pdfs_used': os.listdir(source_pdf)})
-    dir_train.update({"pdfs_used": os.listdir(project_paths.path_folder_source_pdf)})
+    # skip hidden files like the s3 sync manifest
+    pdfs_used = [name for name in os.listdir(project_paths.path_folder_source_pdf) if not name.startswith(".")]
+    dir_train.update({"pdfs_used": pdfs_used})
     first = True
     for filename in os.listdir(str(project_paths.path_folder_source_annotation)):
         if filename[-5:] == ".xlsx":